@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+"""Compact binary log sink for python_toolbox and a decoder for its files.
+
+A binary log file is the MAGIC bytes followed by length-prefixed frames. Each frame is a
+_FRAME header (payload length, frame kind) and its payload:
+
+    KIND_ANCHOR: monotonic_ns and wall-clock time of the moment the file was opened
+    KIND_LEVEL:  level number, then the UTF-8 level name
+    KIND_SITE:   call-site id and line number, then UTF-8 "filename\\0method\\0class_name"
+    KIND_RECORD: level number, monotonic_ns, call-site id and flags, then the UTF-8 message
+
+Level names and call sites are written once per file session and referenced by id afterwards.
+Every open appends a new anchor, so ids are only valid until the next KIND_ANCHOR frame.
+
+Usage:
+    python binary_log.py LOG_FILE [--json] [--format FMT] [--date-format DATEFMT]
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from argparse import ArgumentParser
+from typing import IO, Any, Dict, Iterator, NamedTuple, Optional, Tuple
+
+MAGIC: bytes = b"PTBLOG\x00\x01"
+
+KIND_ANCHOR: int = 1
+KIND_LEVEL: int = 2
+KIND_SITE: int = 3
+KIND_RECORD: int = 4
+
+# The record was logged through UtilsClass and its text starts with the padded call-site prefix.
+FLAG_CALL_SITE_PREFIX: int = 1
+
+_FRAME = struct.Struct("<IB")  # payload length, frame kind
+_ANCHOR = struct.Struct("<qd")  # monotonic_ns, time.time()
+_LEVEL = struct.Struct("<H")  # level number
+_SITE = struct.Struct("<II")  # call-site id, line number
+_RECORD = struct.Struct("<HqIB")  # level number, monotonic_ns, call-site id, flags
+
+DEFAULT_FORMAT: str = "[%(asctime)s] [%(levelname)-8s] - %(message)s"
+DEFAULT_DATE_FORMAT: str = "%Y-%m-%d %H:%M:%S"
+
+CallSite = Tuple[str, str, int, Optional[str]]
+
+
+def _frame(kind: int, payload: bytes) -> bytes:
+    return _FRAME.pack(len(payload), kind) + payload
+
+
+class BinaryLogHandler(logging.Handler):
+
+    """logging.Handler that appends length-prefixed binary records to a file.
+
+    Records produced by UtilsClass.log_message/_print_status keep their call site and monotonic timestamp, and only the message body is stored, so no timestamp or padding formatting happens at write time. This also holds behind setup_logger's cfg.queue, whose BoundedQueueHandler keeps the _LogMessage. Other records use the LogRecord's filename, funcName and lineno, and their creation time mapped onto the file's monotonic clock, not the time they are written.
+    """
+
+    def __init__(self, filename: str, flush_level: int = logging.WARNING) -> None:
+        """Class initializer.
+
+        Args:
+            filename (str): file to append to. Created with the MAGIC header if missing or empty.
+            flush_level (int, optional): records at or above this level are flushed to disk immediately. Defaults to logging.WARNING.
+        """
+        super().__init__()
+        self.baseFilename: str = os.path.abspath(filename)
+        self.flush_level: int = flush_level
+        self._stream: Optional[IO[bytes]] = open(self.baseFilename, "ab")
+        self._levels: Dict[int, None] = {}
+        self._sites: Dict[CallSite, int] = {}
+        if self._stream.tell() == 0:
+            self._stream.write(MAGIC)
+        self._anchor_monotonic_ns: int = time.monotonic_ns()
+        self._anchor_time: float = time.time()
+        self._stream.write(
+            _frame(KIND_ANCHOR, _ANCHOR.pack(self._anchor_monotonic_ns, self._anchor_time))
+        )
+        self._stream.flush()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Appends a record, preceded by level/call-site definitions the first time they are seen.
+
+        Args:
+            record (logging.LogRecord): record to write
+        """
+        stream: Optional[IO[bytes]] = self._stream
+        if stream is None:
+            return
+        try:
+            call_site: Optional[CallSite] = getattr(record.msg, "call_site", None)
+            flags: int = 0
+            monotonic_ns: int
+            message: str
+            if call_site is None:
+                call_site = (record.filename, record.funcName, record.lineno, None)
+                monotonic_ns = self._anchor_monotonic_ns + round(
+                    (record.created - self._anchor_time) * 1e9
+                )
+                message = record.getMessage()
+            else:
+                flags |= FLAG_CALL_SITE_PREFIX
+                monotonic_ns = record.msg.monotonic_ns
+                message = record.msg.body
+            if record.exc_info:
+                message += "\n" + logging.Formatter().formatException(record.exc_info)
+
+            frames: bytearray = bytearray()
+            if record.levelno not in self._levels:
+                self._levels[record.levelno] = None
+                frames += _frame(
+                    KIND_LEVEL,
+                    _LEVEL.pack(record.levelno) + record.levelname.encode("utf-8"),
+                )
+            site_id: Optional[int] = self._sites.get(call_site)
+            if site_id is None:
+                site_id = len(self._sites)
+                self._sites[call_site] = site_id
+                filename, method_name, lineno, class_name = call_site
+                frames += _frame(
+                    KIND_SITE,
+                    _SITE.pack(site_id, lineno)
+                    + f"{filename}\0{method_name}\0{class_name or ''}".encode("utf-8"),
+                )
+            frames += _frame(
+                KIND_RECORD,
+                _RECORD.pack(record.levelno, monotonic_ns, site_id, flags)
+                + message.encode("utf-8", "backslashreplace"),
+            )
+            stream.write(frames)
+            if record.levelno >= self.flush_level:
+                stream.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            if self._stream is not None:
+                self._stream.flush()
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        self.acquire()
+        try:
+            if self._stream is not None:
+                self._stream.flush()
+                self._stream.close()
+                self._stream = None
+        finally:
+            self.release()
+            super().close()
+
+
+class BinaryLogRecord(NamedTuple):
+
+    """Record decoded from a binary log file."""
+
+    created: float
+    monotonic_ns: int
+    levelno: int
+    levelname: str
+    filename: str
+    method_name: str
+    lineno: int
+    class_name: Optional[str]
+    message: str
+    flags: int
+
+    @property
+    def text(self) -> str:
+        """Message with the call-site prefix that UtilsClass renders for text handlers (see _LogMessage in python_toolbox.py)."""
+        if not self.flags & FLAG_CALL_SITE_PREFIX:
+            return self.message
+        text: str = f"{f'{{{self.filename}}} - {self.method_name}:{self.lineno}':>64} - "
+        if self.class_name is not None:
+            text += f"{f'{{{self.filename}}} - {self.class_name}.{self.method_name}:{self.lineno}':>64} - "
+        return text + self.message
+
+
+def read_records(filename: str) -> Iterator[BinaryLogRecord]:
+    """Decodes the records of a binary log file. A truncated trailing frame (e.g. after a crash) ends the iteration.
+
+    Args:
+        filename (str): file written by BinaryLogHandler
+
+    Raises:
+        ValueError: if the file does not start with MAGIC
+
+    Yields:
+        BinaryLogRecord: decoded records in file order
+    """
+    with open(filename, "rb") as log_file:
+        if os.fstat(log_file.fileno()).st_size < len(MAGIC):
+            raise ValueError(f"{filename} is not a binary log file")
+        with mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[: len(MAGIC)] != MAGIC:
+                raise ValueError(f"{filename} is not a binary log file")
+            yield from _read_frames(data)
+
+
+def _read_frames(data: mmap.mmap) -> Iterator[BinaryLogRecord]:
+    """Walks the frames after MAGIC, tracking the level and call-site tables of the current session."""
+    anchor_monotonic_ns: int = 0
+    anchor_time: float = 0.0
+    level_names: Dict[int, str] = {}
+    sites: Dict[int, CallSite] = {}
+    offset: int = len(MAGIC)
+    while offset + _FRAME.size <= len(data):
+        length, kind = _FRAME.unpack_from(data, offset)
+        start: int = offset + _FRAME.size
+        end: int = start + length
+        if end > len(data):
+            break
+        offset = end
+        if kind == KIND_RECORD:
+            levelno, monotonic_ns, site_id, flags = _RECORD.unpack_from(data, start)
+            filename_, method_name, lineno, class_name = sites.get(
+                site_id, ("", "", 0, None)
+            )
+            yield BinaryLogRecord(
+                created=anchor_time + (monotonic_ns - anchor_monotonic_ns) / 1e9,
+                monotonic_ns=monotonic_ns,
+                levelno=levelno,
+                levelname=level_names.get(levelno, f"Level {levelno}"),
+                filename=filename_,
+                method_name=method_name,
+                lineno=lineno,
+                class_name=class_name,
+                message=data[start + _RECORD.size : end].decode("utf-8"),
+                flags=flags,
+            )
+        elif kind == KIND_SITE:
+            site_id, lineno = _SITE.unpack_from(data, start)
+            filename_, method_name, class_name = (
+                data[start + _SITE.size : end].decode("utf-8").split("\0")
+            )
+            sites[site_id] = (filename_, method_name, lineno, class_name or None)
+        elif kind == KIND_LEVEL:
+            (levelno,) = _LEVEL.unpack_from(data, start)
+            level_names[levelno] = data[start + _LEVEL.size : end].decode("utf-8")
+        elif kind == KIND_ANCHOR:
+            anchor_monotonic_ns, anchor_time = _ANCHOR.unpack_from(data, start)
+            level_names.clear()
+            sites.clear()
+
+
+def to_text(
+    record: BinaryLogRecord,
+    formatter: logging.Formatter,
+) -> str:
+    """Renders a decoded record the way setup_logger's text out_file handler would."""
+    log_record: logging.LogRecord = logging.makeLogRecord(
+        {
+            "created": record.created,
+            "msecs": (record.created - int(record.created)) * 1000,
+            "levelno": record.levelno,
+            "levelname": record.levelname,
+            "pathname": record.filename,
+            "filename": record.filename,
+            "module": os.path.splitext(record.filename)[0],
+            "funcName": record.method_name,
+            "lineno": record.lineno,
+            "msg": record.text,
+        }
+    )
+    return formatter.format(log_record)
+
+
+def to_json(record: BinaryLogRecord, date_format: str) -> str:
+    """Renders a decoded record as one JSON line."""
+    fields: Dict[str, Any] = {
+        "asctime": time.strftime(date_format, time.localtime(record.created)),
+        "created": record.created,
+        "monotonic_ns": record.monotonic_ns,
+        "levelname": record.levelname,
+        "levelno": record.levelno,
+        "filename": record.filename,
+        "method": record.method_name,
+        "lineno": record.lineno,
+        "class_name": record.class_name,
+        "message": record.message,
+    }
+    return json.dumps(fields, ensure_ascii=False)
+
+
+def main(filename: str, as_json: bool, fmt: str, date_format: str) -> int:
+    formatter: logging.Formatter = logging.Formatter(fmt=fmt, datefmt=date_format)
+    try:
+        for record in read_records(filename):
+            if as_json:
+                print(to_json(record, date_format), file=sys.stdout)
+            else:
+                print(to_text(record, formatter), file=sys.stdout)
+    except BrokenPipeError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Exception: {e}", file=sys.stderr)
+        return -1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        prog=os.path.basename(__file__),
+        usage="%(prog)s [options] LOG_FILE",
+        description="Decode a binary log written by setup_logger (cfg.out_file_format: binary) to text or JSON lines.",
+        prefix_chars="-",
+        add_help=True,
+    )
+    parser.add_argument(
+        "log_file",
+        help="Binary log file to decode.",
+        metavar="LOG_FILE",
+    )
+    parser.add_argument(
+        "-j",
+        "--json",
+        help="Output one JSON object per record instead of text. Defaults to False.",
+        dest="as_json",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        default=DEFAULT_FORMAT,
+        help="logging format string for text output. Defaults to the setup_logger default.",
+        metavar="FMT",
+        dest="fmt",
+    )
+    parser.add_argument(
+        "-d",
+        "--date-format",
+        default=DEFAULT_DATE_FORMAT,
+        help="strftime format for timestamps. Defaults to the setup_logger default.",
+        metavar="DATEFMT",
+        dest="date_format",
+    )
+
+    args = parser.parse_args(sys.argv[1:])
+    sys.exit(main(args.log_file, args.as_json, args.fmt, args.date_format))
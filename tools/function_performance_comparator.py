@@ -15,44 +15,1635 @@
 
 # compare_performance(add, multiply, subtract, 2, 3, iterations=1.0e6)
 
+# # Repeated rounds within a time budget of 0.5 s per candidate:
+# FunctionPerformanceComparator(rounds=15, time_budget=0.5)(add, multiply, subtract, 2, 3)
+
+# # Each round in a fresh worker process pinned to CPU 2 or 3, candidates interleaved:
+# FunctionPerformanceComparator(isolation="round", cpus=[2, 3], interleave=True)(add, multiply, subtract, 2, 3)
+
+# # Also report memory per call, measured in a separate tracemalloc pass, and rank by a combined score:
+# FunctionPerformanceComparator(memory=True, rank_by="combined")(add, multiply, subtract, 2, 3)
+
+# # Scaling of each candidate over input sizes, with fitted complexity and crossover sizes:
+# sweep = FunctionPerformanceComparator(rounds=5).sweep([sorted, insertion_sort], lambda n: random.sample(range(n), n), [10, 100, 1000])
+# sweep.write_csv("sweep.csv")
+
+# # Append every run to a JSON-lines history, then gate a build on slowdowns against the previous version:
+# FunctionPerformanceComparator(history="bench_history.jsonl")(add, multiply, subtract, 2, 3)
+# # $ python function_performance_comparator.py compare bench_history.jsonl || exit 1
+
+# # A benchmark suite next to the code, in bench_sorting.py:
+# def bench_sorted():
+#     sorted(DATA)
+#
+# @benchmark_group(fixture=lambda: random.sample(range(1000), 1000), time_budget=0.5)
+# def sorting():
+#     return [sorted, insertion_sort]
+#
+# # run with:
+# # $ python function_performance_comparator.py run bench_sorting.py -k sorting --json results.json
+
+# # Coroutine functions run on one reused event loop, 16 calls in flight, with latency percentiles and throughput:
+# async def fetch(key):
+#     await asyncio.sleep(0.001)
+#
+# FunctionPerformanceComparator(concurrency=16, time_budget=2)(fetch, "key")
+
 # # Output:
-# # subtract is fastest: 1.16e-02 seconds over 100000 iterations
-# # multiply is slower : 1.24e-02 seconds over 100000 iterations
-# #      add is slower : 2.49e-02 seconds over 100000 iterations
+# #      add is tied   : 3.60e-08 s/call (IQR 1.1e-09, 15/15 rounds x 1000000 iterations)
+# # subtract is tied   : 3.62e-08 s/call (IQR 9.8e-10, 15/15 rounds x 1000000 iterations) p=0.412
+# # multiply is slower : 3.91e-08 s/call (IQR 1.3e-09, 14/15 rounds x 1000000 iterations) p=0.000
 
+import asyncio
+import contextlib
+import csv
+import fnmatch
+import functools
+import hashlib
+import importlib
+import importlib.util
+import inspect
+import itertools
+import json
+import keyword
+import math
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import time
 import timeit
-from typing import Any, Callable, List, Tuple
+import tracemalloc
+from argparse import ArgumentParser
+from types import ModuleType
+from typing import IO, Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+ISOLATION_MODES: Tuple[str, ...] = ("none", "candidate", "round")
+# seconds of timed rounds per candidate when neither iterations nor a time budget are given
+DEFAULT_TIME_BUDGET: float = 1.0
+RANKINGS: Tuple[str, ...] = ("time", "memory", "combined")
+
+
+class MemoryResult(NamedTuple):
+
+    """Memory use of one candidate per call, measured with tracemalloc."""
+
+    # largest traced memory above the pre-call level reached during a single call
+    peak_bytes: int
+    # traced memory still allocated after a call, including the returned value
+    net_bytes: float
+    # pymalloc blocks still allocated after a call, including the returned value; not an allocation
+    # count, since blocks freed before the call returns are not seen
+    retained_blocks: float
+
+
+class LatencyResult(NamedTuple):
+
+    """Latency and throughput of a coroutine function called with a fixed number of calls in flight."""
+
+    concurrency: int
+    # seconds from the call to the end of the await, over every call of every timed round
+    p50: float
+    p90: float
+    p99: float
+    max: float
+    # calls per second over all calls in flight, 1 / BenchmarkResult.median
+    throughput: float
+
+
+class BenchmarkResult(NamedTuple):
+
+    """Timing statistics of one candidate. Times are seconds per call."""
+
+    name: str
+    median: float
+    iqr: float
+    mean: float
+    stdev: float
+    # per-call time of every round kept after outlier rejection
+    samples: Tuple[float, ...]
+    rejected: int
+    iterations: int
+    # ranked by time: "fastest", "tied" (not significantly slower than the fastest), "slower", or
+    # "insufficient rounds" when too few rounds were kept for any difference to reach alpha;
+    # ranked by memory or combined score: "best", "tied" or "worse"
+    status: str = ""
+    # two-sided Mann-Whitney U p-value against the fastest candidate, None for the fastest itself
+    p_value: Optional[float] = None
+    memory: Optional[MemoryResult] = None
+    # set for coroutine functions, whose median is then wall time per call with concurrency calls in flight
+    latency: Optional[LatencyResult] = None
+
+
+# growth models fitted by sweeps, as t(n) = coefficient * model(n)
+COMPLEXITY_MODELS: Dict[str, Callable[[float], float]] = {
+    "O(1)": lambda n: 1.0,
+    "O(n)": lambda n: n,
+    "O(n log n)": lambda n: n * math.log2(n) if n > 1 else 0.0,
+    "O(n^2)": lambda n: n * n,
+}
+
+
+class ComplexityFit(NamedTuple):
+
+    """Growth model that best fits the median times of one candidate over a sweep."""
+
+    name: str
+    model: str
+    # seconds per call per unit of model(n)
+    coefficient: float
+    # root mean square of the fit residuals relative to the mean time, lower is better
+    rms: float
+
+
+class Crossover(NamedTuple):
+
+    """Input size between two sweep sizes at which two candidates swap places."""
+
+    # faster candidate below the crossover size
+    faster_below: str
+    # faster candidate above the crossover size
+    faster_above: str
+    # interpolated on a log-log scale between the two sizes that bracket it
+    size: float
+
+
+class SweepResult(NamedTuple):
+
+    """Timing statistics of every candidate at every input size of a sweep."""
+
+    sizes: Tuple[int, ...]
+    # candidate name -> results in the order of sizes
+    results: Dict[str, List[BenchmarkResult]]
+    fits: List[ComplexityFit]
+    crossovers: List[Crossover]
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Returns one flat row per candidate and size, for plotting."""
+        rows: List[Dict[str, Any]] = []
+        for name, results in self.results.items():
+            for size, result in zip(self.sizes, results):
+                row: Dict[str, Any] = {
+                    "size": size,
+                    "name": name,
+                    "median": result.median,
+                    "iqr": result.iqr,
+                    "mean": result.mean,
+                    "stdev": result.stdev,
+                    "rounds": len(result.samples),
+                    "iterations": result.iterations,
+                }
+                if result.memory is not None:
+                    row.update(result.memory._asdict())
+                rows.append(row)
+        return rows
+
+    def write_csv(self, file: Union[str, IO[str]]) -> None:
+        """Writes rows() as CSV to a path or an open text file."""
+        rows: List[Dict[str, Any]] = self.rows()
+        if isinstance(file, str):
+            with open(file, "w", newline="") as csv_file:
+                return self.write_csv(csv_file)
+        writer: csv.DictWriter = csv.DictWriter(file, fieldnames=list(rows[0]) if rows else ["size", "name"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+    def write_json(self, file: Union[str, IO[str]]) -> None:
+        """Writes rows(), fits and crossovers as one JSON object to a path or an open text file."""
+        if isinstance(file, str):
+            with open(file, "w") as json_file:
+                return self.write_json(json_file)
+        json.dump(
+            json_safe(
+                {
+                    "sizes": list(self.sizes),
+                    "rows": self.rows(),
+                    "fits": [fit._asdict() for fit in self.fits],
+                    "crossovers": [crossover._asdict() for crossover in self.crossovers],
+                }
+            ),
+            file,
+            indent=2,
+            allow_nan=False,
+        )
+
+
+class HistoryEntry(NamedTuple):
+
+    """One candidate of one run, as stored in a HistoryStore."""
+
+    # "module.qualname" of the candidate
+    qualname: str
+    # SHA-1 of the candidate's source, see source_hash
+    source_hash: str
+    host: str
+    # time.time() of the run
+    created: float
+    # free-form label of the run, e.g. a commit or "baseline"
+    tag: str
+    median: float
+    iterations: int
+    samples: Tuple[float, ...]
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.qualname, self.host
+
+
+class HistoryComparison(NamedTuple):
+
+    """Latest run of a candidate compared with its baseline."""
+
+    qualname: str
+    host: str
+    baseline: HistoryEntry
+    current: HistoryEntry
+    # current median / baseline median - 1
+    change: float
+    # two-sided Mann-Whitney U p-value of the current against the baseline samples
+    p_value: float
+    # significantly slower by more than the threshold
+    regressed: bool
+
+
+class HistoryStore:
+
+    """Append-only JSON-lines file of benchmark results, one line per candidate and run, keyed by qualified name, source hash and host."""
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+
+    def record(
+        self,
+        functions: Sequence[Callable],
+        results: Sequence[BenchmarkResult],
+        tag: str = "",
+    ) -> List[HistoryEntry]:
+        """Appends the results of one run.
+
+        Args:
+            functions (Sequence[Callable]): candidates, in the order of results
+            results (Sequence[BenchmarkResult]): results of the run
+            tag (str, optional): label stored with every entry. Defaults to "".
+
+        Returns:
+            List[HistoryEntry]: the appended entries
+        """
+        created: float = time.time()
+        host: str = platform.node()
+        entries: List[HistoryEntry] = [
+            HistoryEntry(
+                qualname=qualified_name(function),
+                source_hash=source_hash(function),
+                host=host,
+                created=created,
+                tag=tag,
+                median=result.median,
+                iterations=result.iterations,
+                samples=result.samples,
+            )
+            for function, result in zip(functions, results)
+        ]
+        with open(self.path, "a") as history_file:
+            for entry in entries:
+                history_file.write(json.dumps(entry._asdict()) + "\n")
+        return entries
+
+    def entries(self) -> List[HistoryEntry]:
+        """Returns all entries in file order. Lines that cannot be parsed, e.g. a line cut short by a crash, are skipped."""
+        if not os.path.exists(self.path):
+            return []
+        entries: List[HistoryEntry] = []
+        with open(self.path) as history_file:
+            for line in history_file:
+                try:
+                    fields: Dict[str, Any] = json.loads(line)
+                    fields["samples"] = tuple(fields["samples"])
+                    entries.append(HistoryEntry(**fields))
+                except (ValueError, TypeError, KeyError):
+                    continue
+        return entries
+
+    def compare(
+        self,
+        baseline_tag: Optional[str] = None,
+        alpha: float = 0.05,
+        threshold: float = 0.05,
+        host: Optional[str] = None,
+    ) -> List[HistoryComparison]:
+        """Compares the latest entry of every (qualname, host) with its baseline: the latest earlier entry tagged baseline_tag if given, otherwise the latest earlier entry with a different source hash, otherwise the previous entry.
+
+        Args:
+            baseline_tag (Optional[str], optional): tag of baseline runs. Defaults to None.
+            alpha (float, optional): significance level of the Mann-Whitney U test. Defaults to 0.05.
+            threshold (float, optional): relative slowdown of the median below which a significant difference is still not a regression. Defaults to 0.05.
+            host (Optional[str], optional): only compare entries of this host; None compares every host. Defaults to None.
+
+        Returns:
+            List[HistoryComparison]: one comparison per key that has a baseline
+        """
+        history: Dict[Tuple[str, str], List[HistoryEntry]] = {}
+        for entry in self.entries():
+            if host is None or entry.host == host:
+                history.setdefault(entry.key, []).append(entry)
+        comparisons: List[HistoryComparison] = []
+        for (qualname, entry_host), entries in history.items():
+            current: HistoryEntry = entries[-1]
+            earlier: List[HistoryEntry] = entries[:-1]
+            if baseline_tag is not None:
+                candidates: List[HistoryEntry] = [entry for entry in earlier if entry.tag == baseline_tag]
+            else:
+                candidates = [
+                    entry for entry in earlier if entry.source_hash != current.source_hash
+                ] or earlier
+            if not candidates:
+                continue
+            baseline: HistoryEntry = candidates[-1]
+            change: float = current.median / baseline.median - 1 if baseline.median else 0.0
+            p_value: float = mann_whitney_u(baseline.samples, current.samples)[1]
+            comparisons.append(
+                HistoryComparison(
+                    qualname=qualname,
+                    host=entry_host,
+                    baseline=baseline,
+                    current=current,
+                    change=change,
+                    p_value=p_value,
+                    regressed=p_value < alpha and change > threshold,
+                )
+            )
+        return comparisons
+
+
+class BenchmarkGroup(NamedTuple):
+
+    """Candidates compared against each other by the run command, with the input they share."""
+
+    name: str
+    # returns the candidates
+    candidates: Callable[[], Sequence[Callable]]
+    # returns the input of every candidate call; a tuple is passed as positional arguments, None as no
+    # arguments, anything else as the only argument
+    fixture: Optional[Callable[[], Any]] = None
+    # FunctionPerformanceComparator options, plus "iterations"
+    options: Dict[str, Any] = {}
+
+
+def benchmark_group(
+    fixture: Optional[Callable[[], Any]] = None, name: Optional[str] = None, **options
+) -> Callable[[Callable[[], Sequence[Callable]]], Callable[[], Sequence[Callable]]]:
+    """Marks a function returning candidates as a benchmark group for the run command.
+
+    Args:
+        fixture (Optional[Callable[[], Any]], optional): returns the input shared by the candidates, called once before the group is measured. Defaults to None.
+        name (Optional[str], optional): group name. Defaults to the function name.
+        **options: FunctionPerformanceComparator options and "iterations" for this group. A time_budget here overrides iterations here. Options given on the command line take precedence, and --iterations replaces the group's time_budget.
+
+    Returns:
+        Callable: decorator returning the function unchanged
+    """
+
+    def decorator(candidates: Callable[[], Sequence[Callable]]) -> Callable[[], Sequence[Callable]]:
+        candidates.__benchmark_group__ = BenchmarkGroup(
+            name=name or candidates.__name__, candidates=candidates, fixture=fixture, options=options
+        )
+        return candidates
+
+    return decorator
 
 
 class FunctionPerformanceComparator:
 
-    def __call__(self, *args, **kwargs) -> None:
+    def __init__(
+        self,
+        warmup: int = 1,
+        rounds: int = 7,
+        time_budget: Optional[float] = None,
+        outlier_k: Optional[float] = 1.5,
+        alpha: float = 0.05,
+        isolation: str = "none",
+        workers: Optional[int] = None,
+        cpus: Optional[Sequence[int]] = None,
+        interleave: bool = False,
+        memory: bool = False,
+        memory_calls: int = 100,
+        rank_by: str = "time",
+        memory_weight: float = 0.5,
+        history: Optional[str] = None,
+        tag: str = "",
+        subtract_overhead: bool = True,
+        concurrency: int = 1,
+    ) -> None:
+        """Class initializer.
+
+        Args:
+            warmup (int, optional): untimed rounds run before measuring each candidate. Defaults to 1.
+            rounds (int, optional): timed rounds per candidate. Defaults to 7.
+            time_budget (Optional[float], optional): seconds of timed rounds per candidate. When set, iterations per round are calibrated to fit it and the iterations argument is ignored. Without it and without iterations, DEFAULT_TIME_BUDGET is used. Defaults to None.
+            outlier_k (Optional[float], optional): rounds outside [Q1 - k*IQR, Q3 + k*IQR] are rejected. None keeps every round. Defaults to 1.5.
+            alpha (float, optional): significance level for calling a candidate slower than the fastest. Defaults to 0.05.
+            isolation (str, optional): "none" runs everything in this interpreter, "candidate" runs all rounds of a candidate in one fresh worker process, "round" runs every round (after its own warmup) in a fresh worker process. Candidates and their arguments must then be picklable. Defaults to "none".
+            workers (Optional[int], optional): worker processes running in parallel. Defaults to len(cpus), or os.cpu_count() without cpus.
+            cpus (Optional[Sequence[int]], optional): CPUs to pin workers to with os.sched_setaffinity, one running worker per CPU. Ignored where unsupported. Defaults to None.
+            interleave (bool, optional): run rounds round-robin across candidates instead of all rounds of one candidate after the other. Defaults to False.
+            memory (bool, optional): measure memory per call in a tracemalloc pass in this process, after all timing rounds so tracing never slows them down. Defaults to False.
+            memory_calls (int, optional): calls made by the memory pass. Defaults to 100.
+            rank_by (str, optional): "time" ranks by median time, "memory" by peak then net bytes per call, "combined" by time_ratio ** (1 - memory_weight) * peak_ratio ** memory_weight relative to the best candidate. "memory" and "combined" imply memory=True. Defaults to "time".
+            memory_weight (float, optional): weight of memory in the combined score, between 0 and 1. Defaults to 0.5.
+            history (Optional[str], optional): JSON-lines file every run is appended to, see HistoryStore. Defaults to None.
+            tag (str, optional): label stored with the runs in history, e.g. a commit or "baseline". Defaults to "".
+            subtract_overhead (bool, optional): subtract the per-iteration cost of an empty timing loop from every round, so only the call itself is reported. Defaults to True.
+            concurrency (int, optional): calls of a coroutine function kept in flight at once. Coroutine functions always run in this process, on an event loop reused across rounds and candidates, and iterations count calls per round. run, sweep and __call__ close the loop when they return, unless the comparator is used as a context manager, which keeps one loop across calls until the with block ends. Defaults to 1.
+        """
+        if isolation not in ISOLATION_MODES:
+            raise ValueError(f"isolation must be one of {ISOLATION_MODES}, not {isolation!r}")
+        if rank_by not in RANKINGS:
+            raise ValueError(f"rank_by must be one of {RANKINGS}, not {rank_by!r}")
+        self.warmup: int = max(0, int(warmup))
+        self.rounds: int = max(1, int(rounds))
+        self.time_budget: Optional[float] = time_budget
+        self.outlier_k: Optional[float] = outlier_k
+        self.alpha: float = alpha
+        self.isolation: str = isolation
+        self.cpus: Optional[List[int]] = list(cpus) if cpus else None
+        if self.cpus and hasattr(os, "sched_getaffinity"):
+            unavailable: List[int] = sorted(set(self.cpus) - os.sched_getaffinity(0))
+            if unavailable:
+                raise ValueError(f"cpus {unavailable} are not available to this process")
+        self.workers: int = max(
+            1, int(workers or (len(self.cpus) if self.cpus else os.cpu_count() or 1))
+        )
+        self.interleave: bool = interleave
+        self.rank_by: str = rank_by
+        self.memory: bool = memory or rank_by != "time"
+        self.memory_calls: int = max(1, int(memory_calls))
+        self.memory_weight: float = min(1.0, max(0.0, memory_weight))
+        self.history: Optional[HistoryStore] = HistoryStore(history) if history else None
+        self.tag: str = tag
+        self.subtract_overhead: bool = subtract_overhead
+        self.concurrency: int = max(1, int(concurrency))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # depth of with blocks around this comparator; the event loop outlives calls only inside them
+        self._entered: int = 0
+
+    def __enter__(self) -> "FunctionPerformanceComparator":
+        self._entered += 1
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._entered -= 1
+        if not self._entered:
+            self.close()
+
+    def __call__(self, *args, **kwargs) -> List[BenchmarkResult]:
         functions: List[Callable] = [arg for arg in args if callable(arg)]
         arguments: List[Any] = [arg for arg in args if not callable(arg)]
 
-        iterations: int = int(kwargs.pop("iterations", 100000))
-        assert iterations <= 1e6, "Max iterations allowed is 1e6"
-        execution_times: List[Tuple[str, float]] = []
+        iterations: Optional[int] = kwargs.pop("iterations", None)
+
+        return self.run(functions, arguments, kwargs, int(iterations) if iterations else None)
+
+    def run(
+        self,
+        functions: Sequence[Callable],
+        arguments: Sequence[Any] = (),
+        kwargs: Optional[Dict[str, Any]] = None,
+        iterations: Optional[int] = None,
+    ) -> List[BenchmarkResult]:
+        """Measures, records to history, ranks and reports. Unlike __call__, arguments may be callables themselves.
+
+        Returns:
+            List[BenchmarkResult]: ranked results
+        """
+        kwargs = kwargs or {}
+        try:
+            results: List[BenchmarkResult] = self.measure(functions, arguments, kwargs, iterations)
+        finally:
+            if not self._entered:
+                self.close()
+        if self.history is not None:
+            self.history.record(functions, results, self.tag)
+        results = self.rank(results)
+        self.report(results)
+        return results
+
+    def sweep(
+        self,
+        functions: Sequence[Callable],
+        generator: Callable[[int], Any],
+        sizes: Sequence[int],
+        time_budget: float = 0.2,
+    ) -> SweepResult:
+        """Times every candidate at every input size, fits its growth with fit_complexity and finds where candidates cross.
+
+        Args:
+            functions (Sequence[Callable]): candidates
+            generator (Callable[[int], Any]): returns the input for a size; a tuple is passed as positional arguments, anything else as the only argument. Called once per size, and the same input is passed to every call of every candidate.
+            sizes (Sequence[int]): input sizes, at least 1
+            time_budget (float, optional): seconds of timed rounds per candidate and size, used unless the comparator has its own time_budget. Iterations are calibrated per size. Defaults to 0.2.
+
+        Returns:
+            SweepResult: results, fits and crossovers
+        """
+        sizes = tuple(sorted(int(size) for size in sizes))
+        if not sizes or sizes[0] < 1:
+            raise ValueError("sizes must be a non-empty sequence of sizes >= 1")
+        results: Dict[str, List[BenchmarkResult]] = {name: [] for name in candidate_names(functions)}
+        try:
+            for size in sizes:
+                arguments: Any = generator(size)
+                if not isinstance(arguments, tuple):
+                    arguments = (arguments,)
+                size_results: List[BenchmarkResult] = self.measure(
+                    functions, arguments, {}, None, time_budget=self.time_budget or time_budget
+                )
+                for name_results, result in zip(results.values(), size_results):
+                    name_results.append(result)
+        finally:
+            if not self._entered:
+                self.close()
+        sweep_result: SweepResult = SweepResult(
+            sizes=sizes,
+            results=results,
+            fits=[
+                fit_complexity(name, sizes, [result.median for result in name_results])
+                for name, name_results in results.items()
+            ],
+            crossovers=find_crossovers(sizes, results),
+        )
+        self.report_sweep(sweep_result)
+        return sweep_result
+
+    @staticmethod
+    def report_sweep(sweep_result: SweepResult) -> None:
+        names: List[str] = list(sweep_result.results)
+        if not names:
+            return
+        width: int = max(10, *(len(name) for name in names))
+        print(f"{'size':>10s} " + " ".join(f"{name:>{width}s}" for name in names))
+        for index, size in enumerate(sweep_result.sizes):
+            print(
+                f"{size:>10d} "
+                + " ".join(
+                    f"{sweep_result.results[name][index].median:>{width}.2e}" for name in names
+                )
+            )
+        for fit in sweep_result.fits:
+            print(f"{fit.name:>{width}s} fits {fit.model:<10s}: {fit.coefficient:.2e} s x n-term (rms {fit.rms:.2f})")
+        for crossover in sweep_result.crossovers:
+            print(
+                f"{crossover.faster_below} is faster below n ~ {crossover.size:.0f}, {crossover.faster_above} above"
+            )
+
+    def measure(
+        self,
+        functions: Sequence[Callable],
+        arguments: Sequence[Any],
+        kwargs: Dict[str, Any],
+        iterations: Optional[int],
+        time_budget: Optional[float] = None,
+    ) -> List[BenchmarkResult]:
+        """Times every function(*arguments, **kwargs) over warmup + rounds rounds, in this process or in worker processes depending on isolation.
+
+        Args:
+            iterations (Optional[int]): iterations per round, used when there is no time budget. None calibrates them to DEFAULT_TIME_BUDGET.
+            time_budget (Optional[float], optional): overrides self.time_budget for this call. Defaults to None.
+
+        Returns:
+            List[BenchmarkResult]: unranked statistics, in the order of functions
+        """
+        time_budget = self.time_budget if time_budget is None else time_budget
+        if time_budget is None and iterations is None:
+            time_budget = DEFAULT_TIME_BUDGET
+        n_coroutine_functions: int = sum(
+            1 for function in functions if is_coroutine_callable(function)
+        )
+        if n_coroutine_functions:
+            if n_coroutine_functions < len(functions):
+                raise ValueError("coroutine functions cannot be compared with regular functions")
+            if self.memory:
+                raise ValueError("memory is not measured for coroutine functions")
+            return self._measure_async(functions, arguments, kwargs, iterations, time_budget)
+        round_time: Optional[float] = time_budget / self.rounds if time_budget is not None else None
+        iterations_per_function: List[int]
+        samples: List[List[float]]
+        if self.isolation == "none":
+            iterations_per_function = [
+                self.calibrate(_make_timer(function, arguments, kwargs), round_time)
+                if round_time is not None
+                else iterations
+                for function in functions
+            ]
+            samples = self._measure_in_process(functions, arguments, kwargs, iterations_per_function)
+        else:
+            samples, iterations_per_function = self._measure_in_workers(
+                functions, arguments, kwargs, iterations, round_time
+            )
+        results: List[BenchmarkResult] = [
+            summarize(name, function_samples, function_iterations, self.outlier_k)
+            for name, function_samples, function_iterations in zip(
+                candidate_names(functions), samples, iterations_per_function
+            )
+        ]
+        if self.memory:
+            results = [
+                result._replace(memory=measure_memory(function, arguments, kwargs, self.memory_calls))
+                for function, result in zip(functions, results)
+            ]
+        return results
+
+    def _measure_async(
+        self,
+        functions: Sequence[Callable],
+        arguments: Sequence[Any],
+        kwargs: Dict[str, Any],
+        iterations: Optional[int],
+        time_budget: Optional[float],
+    ) -> List[BenchmarkResult]:
+        """Times coroutine functions on the reused event loop. A round awaits iterations calls with concurrency of them in flight; its sample is the round's wall time per call."""
+        loop: asyncio.AbstractEventLoop = self._event_loop()
+        calls_per_function: List[int] = [
+            self._calibrate_async(loop, function, arguments, kwargs, time_budget / self.rounds)
+            if time_budget is not None
+            else max(1, iterations)
+            for function in functions
+        ]
+        samples: List[List[float]] = [[] for _ in functions]
+        latencies: List[List[float]] = [[] for _ in functions]
+        warmed_up: List[bool] = [False] * len(functions)
+        for index, rounds in self._schedule(len(functions), 1 if self.interleave else self.rounds):
+            calls: int = calls_per_function[index]
+            for _ in range(0 if warmed_up[index] else self.warmup):
+                loop.run_until_complete(
+                    _drive(functions[index], arguments, kwargs, calls, self.concurrency)
+                )
+            warmed_up[index] = True
+            for _ in range(rounds):
+                round_latencies, elapsed = loop.run_until_complete(
+                    _drive(functions[index], arguments, kwargs, calls, self.concurrency)
+                )
+                latencies[index] += round_latencies
+                samples[index].append(elapsed / calls)
+        results: List[BenchmarkResult] = []
+        for name, function_samples, function_latencies, calls in zip(
+            candidate_names(functions), samples, latencies, calls_per_function
+        ):
+            result: BenchmarkResult = summarize(name, function_samples, calls, self.outlier_k)
+            results.append(
+                result._replace(
+                    latency=summarize_latency(function_latencies, self.concurrency, result.median)
+                )
+            )
+        return results
+
+    def _calibrate_async(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        function: Callable,
+        arguments: Sequence[Any],
+        kwargs: Dict[str, Any],
+        round_time: float,
+    ) -> int:
+        """Like calibrate, for calls of a coroutine function, starting from one call per slot in flight."""
+        calls: int = self.concurrency
+        while True:
+            elapsed: float = loop.run_until_complete(
+                _drive(function, arguments, kwargs, calls, self.concurrency)
+            )[1]
+            if elapsed >= round_time / 10:
+                break
+            calls *= 10
+        return max(self.concurrency, int(calls * round_time / elapsed))
 
-        for function in functions:
-            time: float = timeit.timeit(lambda: function(*arguments, **kwargs), number=iterations)
-            execution_times.append((function.__name__, time))
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        return self._loop
 
-        execution_times.sort(key=lambda x: x[1])
+    def close(self) -> None:
+        """Closes the event loop used for coroutine functions. A later measurement opens a new one."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+            self._loop.close()
+        self._loop = None
 
-        # Print the result
-        name_max_len: int = max(len(item[0]) for item in execution_times)
-        for i, (function_name, exec_time) in enumerate(execution_times):
-            speed_status: str = 'fastest' if i == 0 else 'slower'
+    def _schedule(self, n_functions: int, rounds_per_task: int) -> List[Tuple[int, int]]:
+        """Returns (function index, rounds) tasks covering all rounds of every function, in run order."""
+        n_tasks: int = math.ceil(self.rounds / rounds_per_task)
+        tasks_of: List[List[Tuple[int, int]]] = [
+            [
+                (index, min(rounds_per_task, self.rounds - task * rounds_per_task))
+                for task in range(n_tasks)
+            ]
+            for index in range(n_functions)
+        ]
+        if self.interleave:
+            return [task for round_tasks in zip(*tasks_of) for task in round_tasks]
+        return [task for function_tasks in tasks_of for task in function_tasks]
+
+    def _measure_in_process(
+        self,
+        functions: Sequence[Callable],
+        arguments: Sequence[Any],
+        kwargs: Dict[str, Any],
+        iterations_per_function: List[int],
+    ) -> List[List[float]]:
+        timers: List[timeit.Timer] = [
+            _make_timer(function, arguments, kwargs) for function in functions
+        ]
+        samples: List[List[float]] = [[] for _ in functions]
+        warmed_up: List[bool] = [False] * len(functions)
+        for index, rounds in self._schedule(len(functions), 1 if self.interleave else self.rounds):
+            samples[index] += _time_rounds(
+                timers[index],
+                iterations_per_function[index],
+                0 if warmed_up[index] else self.warmup,
+                rounds,
+                self.subtract_overhead,
+            )
+            warmed_up[index] = True
+        return samples
+
+    def _measure_in_workers(
+        self,
+        functions: Sequence[Callable],
+        arguments: Sequence[Any],
+        kwargs: Dict[str, Any],
+        iterations: Optional[int],
+        round_time: Optional[float],
+    ) -> Tuple[List[List[float]], List[int]]:
+        """Runs each task in a fresh worker process (maxtasksperchild=1), so no task sees the memory, cache or GC state left by another.
+        Iterations are calibrated to round_time in workers too, so this process never runs a candidate before forking them: with isolation "candidate" by the task that measures the candidate, with "round" by one extra task per candidate first.
+
+        Returns:
+            Tuple[List[List[float]], List[int]]: samples and iterations per round of each function
+        """
+        context: Any = multiprocessing.get_context()
+        cpu_queue: Optional[Any] = None
+        if self.cpus and hasattr(os, "sched_setaffinity"):
+            cpu_queue = context.Queue()
+            for cpu in self.cpus:
+                cpu_queue.put(cpu)
+        rounds_per_task: int = self.rounds if self.isolation == "candidate" else 1
+        samples: List[List[float]] = [[] for _ in functions]
+        iterations_per_function: List[Optional[int]] = [
+            None if round_time is not None else iterations for _ in functions
+        ]
+        with context.Pool(
+            processes=self.workers,
+            initializer=_init_worker,
+            initargs=(cpu_queue,),
+            maxtasksperchild=1,
+        ) as pool:
+            if round_time is not None and self.isolation == "round":
+                calibrations: List[Any] = [
+                    pool.apply_async(
+                        _run_isolated,
+                        (function, tuple(arguments), kwargs, None, 0, 0, False, round_time),
+                    )
+                    for function in functions
+                ]
+                iterations_per_function = [calibration.get()[0] for calibration in calibrations]
+            pending: List[Tuple[int, Any]] = [
+                (
+                    index,
+                    pool.apply_async(
+                        _run_isolated,
+                        (
+                            functions[index],
+                            tuple(arguments),
+                            kwargs,
+                            iterations_per_function[index],
+                            self.warmup,
+                            rounds,
+                            self.subtract_overhead,
+                            round_time,
+                        ),
+                    ),
+                )
+                for index, rounds in self._schedule(len(functions), rounds_per_task)
+            ]
+            for index, async_result in pending:
+                task_iterations, task_samples = async_result.get()
+                iterations_per_function[index] = task_iterations
+                samples[index] += task_samples
+        return samples, iterations_per_function
+
+    @staticmethod
+    def calibrate(timer: timeit.Timer, round_time: float) -> int:
+        """Returns the iterations for one round to take about round_time seconds, growing them 10x at a time like timeit.Timer.autorange until a trial takes a tenth of it.
+
+        Args:
+            timer (timeit.Timer): timer of the candidate
+            round_time (float): target seconds per round
+
+        Returns:
+            int: iterations per round, at least 1
+        """
+        iterations: int = 1
+        while True:
+            elapsed: float = timer.timeit(number=iterations)
+            if elapsed >= round_time / 10:
+                break
+            iterations *= 10
+        return max(1, int(iterations * round_time / elapsed))
+
+    def rank(self, results: List[BenchmarkResult]) -> List[BenchmarkResult]:
+        """Sorts results by rank_by and labels them. By time, each candidate is tested against the fastest with a Mann-Whitney U test; by memory or combined score, candidates with the same score as the best are tied.
+
+        Returns:
+            List[BenchmarkResult]: results with status (and p_value by time) set, best first
+        """
+        if not results:
+            return results
+        if self.rank_by != "time":
+            return self._rank_by_score(results)
+        results = sorted(results, key=lambda result: result.median)
+        fastest: BenchmarkResult = results[0]
+        ranked: List[BenchmarkResult] = []
+        for result in results[1:]:
+            p_value: float = mann_whitney_u(fastest.samples, result.samples)[1]
+            status: str
+            if p_value < self.alpha:
+                status = "slower"
+            elif mann_whitney_min_p_value(len(fastest.samples), len(result.samples)) >= self.alpha:
+                status = "insufficient rounds"
+            else:
+                status = "tied"
+            ranked.append(result._replace(status=status, p_value=p_value))
+        statuses: Set[str] = {result.status for result in ranked}
+        fastest_status: str = (
+            "tied"
+            if "tied" in statuses
+            else "insufficient rounds"
+            if "insufficient rounds" in statuses
+            else "fastest"
+        )
+        return [fastest._replace(status=fastest_status)] + ranked
+
+    def _rank_by_score(self, results: List[BenchmarkResult]) -> List[BenchmarkResult]:
+        best_median: float = min(result.median for result in results) or 1e-12
+        best_peak: int = max(1, min(result.memory.peak_bytes for result in results))
+
+        def score(result: BenchmarkResult) -> Tuple[float, float]:
+            if self.rank_by == "memory":
+                return result.memory.peak_bytes, result.memory.net_bytes
+            time_ratio: float = result.median / best_median
+            peak_ratio: float = max(1, result.memory.peak_bytes) / best_peak
+            return time_ratio ** (1 - self.memory_weight) * peak_ratio ** self.memory_weight, 0.0
+
+        results = sorted(results, key=score)
+        best_score: Tuple[float, float] = score(results[0])
+        statuses: List[str] = [
+            "tied" if score(result) == best_score else "worse" for result in results
+        ]
+        if statuses.count("tied") == 1:
+            statuses[0] = "best"
+        return [result._replace(status=status) for result, status in zip(results, statuses)]
+
+    @staticmethod
+    def report(results: List[BenchmarkResult]) -> None:
+        if not results:
+            return
+        name_max_len: int = max(len(result.name) for result in results)
+        for result in results:
+            p_value: str = f" p={result.p_value:.3f}" if result.p_value is not None else ""
+            memory: str = (
+                f", peak {result.memory.peak_bytes} B, net {result.memory.net_bytes:.0f} B, {result.memory.retained_blocks:.1f} retained blocks/call"
+                if result.memory is not None
+                else ""
+            )
+            latency: str = (
+                f", {result.latency.throughput:.3g} calls/s at concurrency {result.latency.concurrency}, "
+                f"latency p50 {result.latency.p50:.2e} p90 {result.latency.p90:.2e} p99 {result.latency.p99:.2e} s"
+                if result.latency is not None
+                else ""
+            )
             print(
-                f"{function_name:>{name_max_len}s} is {speed_status:<7s}: {exec_time:.2e} seconds over {iterations} iterations"
+                f"{result.name:>{name_max_len}s} is {result.status:<7s}: {result.median:.2e} s/call "
+                f"(IQR {result.iqr:.1e}, {len(result.samples)}/{len(result.samples) + result.rejected} rounds x {result.iterations} iterations){p_value}{memory}{latency}"
             )
 
     @classmethod
-    def compare_performance(cls, *args, **kwargs) -> None:
-        comparator = cls()
-        comparator(*args, **kwargs)
+    def compare_performance(cls, *args, **kwargs) -> List[BenchmarkResult]:
+        with cls() as comparator:
+            return comparator(*args, **kwargs)
+
+
+def _make_timer(function: Callable, arguments: Sequence[Any], kwargs: Dict[str, Any]) -> timeit.Timer:
+    """Compiles a timing loop specialized to the call: the function and every argument are bound to local variables of timeit's inner function and passed one by one, so an iteration costs the call and the loop only, without a closure call or argument unpacking.
+    Keyword arguments that are not identifiers fall back to **kwargs."""
+    namespace: Dict[str, Any] = {"_function": function}
+    setup: List[str] = ["_f = _function"]
+    call_arguments: List[str] = []
+    for index, argument in enumerate(arguments):
+        namespace[f"_argument{index}"] = argument
+        setup.append(f"_a{index} = _argument{index}")
+        call_arguments.append(f"_a{index}")
+    if all(key.isidentifier() and not keyword.iskeyword(key) for key in kwargs):
+        for index, (key, value) in enumerate(kwargs.items()):
+            namespace[f"_kwarg{index}"] = value
+            setup.append(f"_k{index} = _kwarg{index}")
+            call_arguments.append(f"{key}=_k{index}")
+    else:
+        namespace["_kwargs"] = kwargs
+        setup.append("_kw = _kwargs")
+        call_arguments.append("**_kw")
+    return timeit.Timer(
+        f"_f({', '.join(call_arguments)})", setup="\n".join(setup), globals=namespace
+    )
+
+
+def _loop_overhead(iterations: int, repeat: int = 3) -> float:
+    """Returns the seconds per iteration of an empty timing loop, the fastest of repeat runs."""
+    return min(timeit.Timer("pass").repeat(repeat=repeat, number=iterations)) / iterations
+
+
+def _time_rounds(
+    timer: timeit.Timer,
+    iterations: int,
+    warmup: int,
+    rounds: int,
+    subtract_overhead: bool = True,
+) -> List[float]:
+    """Runs warmup untimed rounds, then returns the seconds per call of each of the timed rounds, less the empty loop overhead measured right before them (never below 0)."""
+    for _ in range(warmup):
+        timer.timeit(number=iterations)
+    overhead: float = _loop_overhead(iterations) if subtract_overhead else 0.0
+    return [
+        max(0.0, timer.timeit(number=iterations) / iterations - overhead) for _ in range(rounds)
+    ]
+
+
+async def _drive(
+    function: Callable,
+    arguments: Sequence[Any],
+    kwargs: Dict[str, Any],
+    calls: int,
+    concurrency: int,
+) -> Tuple[List[float], float]:
+    """Awaits calls calls of a coroutine function from concurrency tasks, each starting its next call as soon as its previous one finished.
+
+    Returns:
+        Tuple[List[float], float]: latency of every call and the wall time of all of them
+    """
+    latencies: List[float] = []
+    remaining: int = calls
+    clock: Callable[[], float] = time.perf_counter
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start: float = clock()
+            await function(*arguments, **kwargs)
+            latencies.append(clock() - start)
+
+    start: float = clock()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, calls))))
+    return latencies, clock() - start
+
+
+# CPUs not used by a running worker; set in worker processes by _init_worker
+_cpu_queue: Optional[Any] = None
+
+
+def _init_worker(cpu_queue: Optional[Any]) -> None:
+    global _cpu_queue
+    _cpu_queue = cpu_queue
+
+
+def _run_isolated(
+    function: Callable,
+    arguments: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+    iterations: Optional[int],
+    warmup: int,
+    rounds: int,
+    subtract_overhead: bool,
+    round_time: Optional[float] = None,
+) -> Tuple[int, List[float]]:
+    """Worker task: pins this process to a free CPU if CPUs were given, calibrates iterations to round_time if they are None, then times the rounds.
+
+    Returns:
+        Tuple[int, List[float]]: iterations per round and seconds per call of each round
+    """
+    cpu: Optional[int] = None
+    if _cpu_queue is not None:
+        cpu = _cpu_queue.get()
+        os.sched_setaffinity(0, {cpu})
+    try:
+        timer: timeit.Timer = _make_timer(function, arguments, kwargs)
+        if iterations is None:
+            iterations = FunctionPerformanceComparator.calibrate(timer, round_time)
+        return iterations, _time_rounds(timer, iterations, warmup, rounds, subtract_overhead)
+    finally:
+        if cpu is not None:
+            _cpu_queue.put(cpu)
+
+
+def measure_memory(
+    function: Callable, arguments: Sequence[Any], kwargs: Dict[str, Any], calls: int = 100
+) -> MemoryResult:
+    """Measures the memory use of function(*arguments, **kwargs) per call with tracemalloc. One untraced call runs first, so one-time caches and imports are not counted. Returned values are kept until the end, so net bytes and retained blocks include them. Neither counts the allocations a call frees before returning; only the peak reflects those.
+
+    Args:
+        function (Callable): candidate
+        arguments (Sequence[Any]): positional arguments
+        kwargs (Dict[str, Any]): keyword arguments
+        calls (int, optional): traced calls. Defaults to 100.
+
+    Returns:
+        MemoryResult: peak, per-call net memory use and retained blocks
+    """
+    function(*arguments, **kwargs)
+    was_tracing: bool = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        results: List[Any] = []
+        peak_bytes: int = 0
+        start_traced: int = tracemalloc.get_traced_memory()[0]
+        start_blocks: int = sys.getallocatedblocks()
+        for _ in range(calls):
+            tracemalloc.reset_peak()
+            before: int = tracemalloc.get_traced_memory()[0]
+            results.append(function(*arguments, **kwargs))
+            peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[1] - before)
+        net_bytes: float = (tracemalloc.get_traced_memory()[0] - start_traced) / calls
+        # the results list itself is not part of the candidate's cost
+        retained_blocks: float = (sys.getallocatedblocks() - start_blocks) / calls
+        net_bytes -= sys.getsizeof(results) / calls
+        del results
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return MemoryResult(
+        peak_bytes=peak_bytes, net_bytes=max(0.0, net_bytes), retained_blocks=max(0.0, retained_blocks)
+    )
+
+
+def summarize(
+    name: str, samples: Sequence[float], iterations: int, outlier_k: Optional[float] = 1.5
+) -> BenchmarkResult:
+    """Computes robust statistics of per-call round times, rejecting outliers with Tukey's fences.
+
+    Args:
+        name (str): candidate name
+        samples (Sequence[float]): seconds per call of every round
+        iterations (int): iterations per round
+        outlier_k (Optional[float], optional): fence multiplier, None keeps every sample. Defaults to 1.5.
+
+    Returns:
+        BenchmarkResult: unranked statistics
+    """
+    kept: List[float] = sorted(samples)
+    if outlier_k is not None and len(kept) >= 4:
+        q1, _, q3 = statistics.quantiles(kept, n=4)
+        low: float = q1 - outlier_k * (q3 - q1)
+        high: float = q3 + outlier_k * (q3 - q1)
+        kept = [sample for sample in kept if low <= sample <= high]
+    iqr: float = 0.0
+    if len(kept) >= 2:
+        q1, _, q3 = statistics.quantiles(kept, n=4)
+        iqr = q3 - q1
+    return BenchmarkResult(
+        name=name,
+        median=statistics.median(kept),
+        iqr=iqr,
+        mean=statistics.fmean(kept),
+        stdev=statistics.stdev(kept) if len(kept) >= 2 else 0.0,
+        samples=tuple(kept),
+        rejected=len(samples) - len(kept),
+        iterations=iterations,
+    )
+
+
+def summarize_latency(latencies: Sequence[float], concurrency: int, median: float) -> LatencyResult:
+    """Computes latency percentiles of coroutine calls.
+
+    Args:
+        latencies (Sequence[float]): seconds of every call
+        concurrency (int): calls in flight
+        median (float): median wall time per call of the rounds
+
+    Returns:
+        LatencyResult: percentiles and throughput
+    """
+    percentiles: List[float] = (
+        statistics.quantiles(latencies, n=100, method="inclusive")
+        if len(latencies) >= 2
+        else list(latencies) * 99
+    )
+    return LatencyResult(
+        concurrency=concurrency,
+        p50=percentiles[49],
+        p90=percentiles[89],
+        p99=percentiles[98],
+        max=max(latencies),
+        throughput=1 / median if median > 0 else math.inf,
+    )
+
 
+# largest sample sizes for which mann_whitney_u computes the exact distribution of U
+MANN_WHITNEY_EXACT_MAX_N: int = 20
 
-def compare_performance(*args, **kwargs) -> None:
-    FunctionPerformanceComparator.compare_performance(*args, **kwargs)
+
+@functools.lru_cache(maxsize=None)
+def _u_cumulative_counts(n1: int, n2: int) -> Tuple[int, ...]:
+    """Returns, for every u, the number of orderings of n1 + n2 distinct values whose U statistic of the first sample is at most u."""
+    # counts[j][u]: orderings of i values of the first and j of the second sample with U = u,
+    # built up one value of the first sample at a time (it adds j to U when placed after j values)
+    counts: List[List[int]] = [[1] for _ in range(n2 + 1)]
+    for _ in range(n1):
+        next_counts: List[List[int]] = []
+        for j in range(n2 + 1):
+            row: List[int] = [0] * (len(counts[j]) + j)
+            for u, count in enumerate(counts[j]):
+                row[u + j] += count
+            if j:
+                for u, count in enumerate(next_counts[j - 1]):
+                    row[u] += count
+            next_counts.append(row)
+        counts = next_counts
+    return tuple(itertools.accumulate(counts[n2]))
+
+
+def mann_whitney_min_p_value(n1: int, n2: int) -> float:
+    """Returns the smallest two-sided p-value mann_whitney_u can give for these sample sizes, i.e. for completely separated samples."""
+    if not n1 or not n2:
+        return 1.0
+    if n1 <= MANN_WHITNEY_EXACT_MAX_N and n2 <= MANN_WHITNEY_EXACT_MAX_N:
+        return min(1.0, 2 / math.comb(n1 + n2, n1))
+    return mann_whitney_u([0.0] * n1, [1.0] * n2)[1]
+
+
+def mann_whitney_u(a: Sequence[float], b: Sequence[float]) -> Tuple[float, float]:
+    """Two-sided Mann-Whitney U test. Up to MANN_WHITNEY_EXACT_MAX_N values per sample the p-value comes from the exact distribution of U (ties are then given mid-ranks, which makes it slightly conservative); above, from the normal approximation with tie correction.
+
+    Args:
+        a (Sequence[float]): first sample
+        b (Sequence[float]): second sample
+
+    Returns:
+        Tuple[float, float]: U statistic of a and the p-value (1.0 if either sample is empty or all values are tied)
+    """
+    n1: int = len(a)
+    n2: int = len(b)
+    if not n1 or not n2:
+        return 0.0, 1.0
+    combined: List[Tuple[float, int]] = sorted(
+        [(value, 0) for value in a] + [(value, 1) for value in b]
+    )
+    n: int = n1 + n2
+    rank_sum_a: float = 0.0
+    tie_term: float = 0.0
+    start: int = 0
+    while start < n:
+        end: int = start
+        while end + 1 < n and combined[end + 1][0] == combined[start][0]:
+            end += 1
+        average_rank: float = (start + end) / 2 + 1
+        ties: int = end - start + 1
+        tie_term += ties**3 - ties
+        rank_sum_a += average_rank * sum(1 for _, group in combined[start : end + 1] if group == 0)
+        start = end + 1
+    u_a: float = rank_sum_a - n1 * (n1 + 1) / 2
+    if n1 <= MANN_WHITNEY_EXACT_MAX_N and n2 <= MANN_WHITNEY_EXACT_MAX_N:
+        cumulative: Tuple[int, ...] = _u_cumulative_counts(n1, n2)
+        total: int = cumulative[-1]
+        at_most: int = cumulative[math.floor(u_a)]
+        # U of a is at least u_a exactly when U of b is at most n1 * n2 - u_a
+        at_least: int = cumulative[math.floor(n1 * n2 - u_a)]
+        return u_a, min(1.0, 2 * min(at_most, at_least) / total)
+    mean_u: float = n1 * n2 / 2
+    variance: float = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return u_a, 1.0
+    z: float = max(0.0, abs(u_a - mean_u) - 0.5) / math.sqrt(variance)
+    return u_a, math.erfc(z / math.sqrt(2))
+
+
+def is_coroutine_callable(function: Callable) -> bool:
+    """Returns True if calling function returns a coroutine: a coroutine function, a functools.partial of one, or an object whose __call__ is one."""
+    while isinstance(function, functools.partial):
+        function = function.func
+    return inspect.iscoroutinefunction(function) or inspect.iscoroutinefunction(
+        getattr(type(function), "__call__", None)
+    )
+
+
+def _candidate_name(function: Callable) -> str:
+    """Returns the __name__ of function, of the function a functools.partial wraps, or else of its class."""
+    while isinstance(function, functools.partial):
+        function = function.func
+    return getattr(function, "__name__", None) or type(function).__name__
+
+
+def candidate_names(functions: Sequence[Callable]) -> List[str]:
+    """Returns the name results report for every candidate: its __name__ (see _candidate_name), with repeats numbered "name#2", "name#3", ... so that every name is unique."""
+    names: List[str] = []
+    seen: Dict[str, int] = {}
+    for function in functions:
+        name: str = _candidate_name(function)
+        seen[name] = seen.get(name, 0) + 1
+        names.append(f"{name}#{seen[name]}" if seen[name] > 1 else name)
+    return names
+
+
+def qualified_name(function: Callable) -> str:
+    return f"{getattr(function, '__module__', None) or '?'}.{getattr(function, '__qualname__', None) or type(function).__qualname__}"
+
+
+def source_hash(function: Callable) -> str:
+    """Returns the SHA-1 of the function's source, or of its code object's bytecode and constants when the source is not available (builtins, REPL, exec)."""
+    try:
+        source: bytes = inspect.getsource(function).encode("utf-8")
+    except (OSError, TypeError):
+        code: Any = getattr(function, "__code__", None)
+        source = (
+            code.co_code + repr(code.co_consts).encode("utf-8")
+            if code is not None
+            else qualified_name(function).encode("utf-8")
+        )
+    return hashlib.sha1(source).hexdigest()
+
+
+def fit_complexity(name: str, sizes: Sequence[int], times: Sequence[float]) -> ComplexityFit:
+    """Fits t(n) = coefficient * model(n) for every COMPLEXITY_MODELS model by least squares and keeps the one with the lowest relative RMS residual. Simpler models win ties.
+
+    Args:
+        name (str): candidate name
+        sizes (Sequence[int]): input sizes
+        times (Sequence[float]): seconds per call at each size
+
+    Returns:
+        ComplexityFit: best fitting model
+    """
+    mean_time: float = statistics.fmean(times) or 1e-12
+    best: Optional[ComplexityFit] = None
+    for model, growth in COMPLEXITY_MODELS.items():
+        terms: List[float] = [growth(size) for size in sizes]
+        denominator: float = sum(term * term for term in terms)
+        coefficient: float = (
+            sum(term * time for term, time in zip(terms, times)) / denominator if denominator else 0.0
+        )
+        rms: float = math.sqrt(
+            statistics.fmean((time - coefficient * term) ** 2 for term, time in zip(terms, times))
+        ) / mean_time
+        if best is None or rms < best.rms:
+            best = ComplexityFit(name=name, model=model, coefficient=coefficient, rms=rms)
+    return best
+
+
+def find_crossovers(
+    sizes: Sequence[int], results: Dict[str, List[BenchmarkResult]]
+) -> List[Crossover]:
+    """Finds, for every pair of candidates, each pair of consecutive sizes between which the faster of the two changes.
+
+    Args:
+        sizes (Sequence[int]): ascending input sizes
+        results (Dict[str, List[BenchmarkResult]]): candidate name -> results in the order of sizes
+
+    Returns:
+        List[Crossover]: crossovers ordered by size
+    """
+    crossovers: List[Crossover] = []
+    names: List[str] = list(results)
+    for first_index, first in enumerate(names):
+        for second in names[first_index + 1 :]:
+            # log of the time ratio, negative where first is faster
+            log_ratios: List[float] = [
+                math.log(max(a.median, 1e-15) / max(b.median, 1e-15))
+                for a, b in zip(results[first], results[second])
+            ]
+            for index in range(1, len(sizes)):
+                before: float = log_ratios[index - 1]
+                after: float = log_ratios[index]
+                if before == 0 or after == 0 or (before < 0) == (after < 0):
+                    continue
+                fraction: float = before / (before - after)
+                size: float = math.exp(
+                    math.log(sizes[index - 1])
+                    + fraction * (math.log(sizes[index]) - math.log(sizes[index - 1]))
+                )
+                faster_below, faster_above = (first, second) if before < 0 else (second, first)
+                crossovers.append(Crossover(faster_below, faster_above, size))
+    return sorted(crossovers, key=lambda crossover: crossover.size)
+
+
+def compare_performance(*args, **kwargs) -> List[BenchmarkResult]:
+    return FunctionPerformanceComparator.compare_performance(*args, **kwargs)
+
+
+def load_benchmark_module(target: str) -> ModuleType:
+    """Imports a module by dotted name, or a .py file by path (its directory is added to sys.path so its own imports and pickling by worker processes work)."""
+    if not target.endswith(".py") and os.sep not in target:
+        return importlib.import_module(target)
+    path: str = os.path.abspath(target)
+    module_name: str = os.path.splitext(os.path.basename(path))[0]
+    sys.path.insert(0, os.path.dirname(path))
+    spec: Any = importlib.util.spec_from_file_location(module_name, path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"cannot import {target}")
+    module: ModuleType = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def collect_benchmarks(module: ModuleType) -> List[BenchmarkGroup]:
+    """Collects the benchmark_group functions of a module and one group named after the module with its argument-less bench_* functions (coroutine functions in a second group, "<module>.async"), in definition order."""
+    groups: List[BenchmarkGroup] = []
+    bench_functions: List[Callable] = []
+    for attribute_name, value in vars(module).items():
+        group: Optional[BenchmarkGroup] = getattr(value, "__benchmark_group__", None)
+        if group is not None:
+            groups.append(group)
+        elif (
+            attribute_name.startswith("bench_")
+            and inspect.isfunction(value)
+            and value.__module__ == module.__name__
+        ):
+            bench_functions.append(value)
+    # coroutine functions are only compared with each other
+    async_functions: List[Callable] = [
+        function for function in bench_functions if is_coroutine_callable(function)
+    ]
+    sync_functions: List[Callable] = [
+        function for function in bench_functions if function not in async_functions
+    ]
+    if async_functions:
+        groups.insert(
+            0, BenchmarkGroup(name=f"{module.__name__}.async", candidates=lambda: async_functions)
+        )
+    if sync_functions:
+        groups.insert(0, BenchmarkGroup(name=module.__name__, candidates=lambda: sync_functions))
+    return groups
+
+
+def run_benchmarks(
+    targets: Sequence[str],
+    pattern: Optional[str],
+    options: Dict[str, Any],
+    json_file: Optional[str],
+) -> int:
+    """Runs every collected group through FunctionPerformanceComparator.
+
+    Args:
+        targets (Sequence[str]): module names or .py paths
+        pattern (Optional[str]): fnmatch pattern, or substring, matched against "group" and "group.candidate"; None runs everything
+        options (Dict[str, Any]): FunctionPerformanceComparator options and "iterations" given on the command line. They take precedence over the group's options; "iterations" also drops the group's time_budget, which would otherwise override it.
+        json_file (Optional[str]): file the results are written to as JSON, "-" for stdout (the report then goes to stderr)
+
+    Returns:
+        int: 0 on success, -1 if a module could not be imported or nothing matched
+    """
+    groups: List[BenchmarkGroup] = []
+    for target in targets:
+        try:
+            groups += collect_benchmarks(load_benchmark_module(target))
+        except Exception as e:
+            print(f"Exception: cannot import {target}: {e}", file=sys.stderr)
+            return -1
+    if pattern is not None and not any(character in pattern for character in "*?["):
+        pattern = f"*{pattern}*"
+
+    output: List[Dict[str, Any]] = []
+    report_stream: IO[str] = sys.stderr if json_file == "-" else sys.stdout
+    for group in groups:
+        candidates: List[Callable] = [
+            candidate
+            for candidate in group.candidates()
+            if pattern is None
+            or fnmatch.fnmatchcase(group.name, pattern)
+            or fnmatch.fnmatchcase(f"{group.name}.{_candidate_name(candidate)}", pattern)
+        ]
+        if not candidates:
+            continue
+        group_options: Dict[str, Any] = {**group.options, **options}
+        if "iterations" in options:
+            group_options.pop("time_budget", None)
+        iterations: Optional[int] = group_options.pop("iterations", None)
+        arguments: Any = group.fixture() if group.fixture is not None else None
+        if arguments is None:
+            arguments = ()
+        elif not isinstance(arguments, tuple):
+            arguments = (arguments,)
+        with contextlib.redirect_stdout(report_stream):
+            print(f"== {group.name}")
+            with FunctionPerformanceComparator(**group_options) as comparator:
+                results: List[BenchmarkResult] = comparator.run(candidates, arguments, {}, iterations)
+        output.append(
+            {
+                "group": group.name,
+                "results": [
+                    {
+                        **result._asdict(),
+                        "memory": result.memory._asdict() if result.memory is not None else None,
+                        "latency": result.latency._asdict() if result.latency is not None else None,
+                    }
+                    for result in results
+                ],
+            }
+        )
+    if not output:
+        print("Exception: no benchmarks matched", file=sys.stderr)
+        return -1
+    if json_file == "-":
+        json.dump(json_safe(output), sys.stdout, indent=2, allow_nan=False)
+        print()
+    elif json_file is not None:
+        with open(json_file, "w") as output_file:
+            json.dump(json_safe(output), output_file, indent=2, allow_nan=False)
+    return 0
+
+
+def json_safe(value: Any) -> Any:
+    """Returns value with every infinite or NaN float replaced by None, which JSON can represent (e.g. the throughput of a call measured as taking no time)."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    return value
+
+
+def compare_history(
+    history_file: str,
+    baseline_tag: Optional[str],
+    alpha: float,
+    threshold: float,
+    host: Optional[str],
+) -> int:
+    try:
+        comparisons: List[HistoryComparison] = HistoryStore(history_file).compare(
+            baseline_tag=baseline_tag, alpha=alpha, threshold=threshold, host=host
+        )
+    except OSError as e:
+        print(f"Exception: {e}", file=sys.stderr)
+        return -1
+    for comparison in comparisons:
+        print(
+            f"{'SLOWER' if comparison.regressed else 'ok':>6s} {comparison.qualname} [{comparison.host}]: "
+            f"{comparison.baseline.median:.2e} -> {comparison.current.median:.2e} s/call "
+            f"({comparison.change:+.1%}) p={comparison.p_value:.3f}"
+        )
+    return 1 if any(comparison.regressed for comparison in comparisons) else 0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        prog=os.path.basename(__file__),
+        usage="%(prog)s COMMAND [options]",
+        description="Benchmark history tools for FunctionPerformanceComparator.",
+        prefix_chars="-",
+        add_help=True,
+    )
+    commands = parser.add_subparsers(dest="command", required=True, metavar="COMMAND")
+
+    run_parser = commands.add_parser(
+        "run",
+        help="Run the bench_* functions and benchmark_group groups of modules.",
+        description="Import modules and run their benchmark_group groups, and their argument-less bench_* functions as one group per module, through FunctionPerformanceComparator.",
+    )
+    run_parser.add_argument(
+        "targets",
+        nargs="+",
+        help="Module names or paths of .py files.",
+        metavar="MODULE",
+    )
+    run_parser.add_argument(
+        "-k",
+        "--filter",
+        help="Only run groups or group.candidate names matching this fnmatch pattern or substring.",
+        metavar="PATTERN",
+        dest="pattern",
+    )
+    # a time budget makes the comparator ignore iterations, so only one of them may be given
+    budget_group = run_parser.add_mutually_exclusive_group()
+    budget_group.add_argument(
+        "-t",
+        "--time-budget",
+        type=float,
+        help="Seconds of timed rounds per candidate. Defaults to the group's, or 1 s.",
+        metavar="SECONDS",
+        dest="time_budget",
+    )
+    run_parser.add_argument(
+        "-r",
+        "--rounds",
+        type=int,
+        help="Timed rounds per candidate. Defaults to the group's, or 7.",
+        metavar="N",
+        dest="rounds",
+    )
+    budget_group.add_argument(
+        "-n",
+        "--iterations",
+        type=int,
+        help="Fixed iterations per round. Takes precedence over the group's time budget. Defaults to the group's, or calibrated to the time budget.",
+        metavar="N",
+        dest="iterations",
+    )
+    run_parser.add_argument(
+        "-i",
+        "--isolation",
+        choices=ISOLATION_MODES,
+        help="Worker process isolation. Defaults to the group's, or none.",
+        dest="isolation",
+    )
+    run_parser.add_argument(
+        "-m",
+        "--memory",
+        action="store_const",
+        const=True,
+        help="Also measure memory per call.",
+        dest="memory",
+    )
+    run_parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        help="Calls of coroutine functions kept in flight. Defaults to the group's, or 1.",
+        metavar="N",
+        dest="concurrency",
+    )
+    run_parser.add_argument(
+        "-j",
+        "--json",
+        help="Write the results as JSON to FILE, '-' for stdout.",
+        metavar="FILE",
+        dest="json_file",
+    )
+    run_parser.add_argument(
+        "--history",
+        help="Append the results to this JSON-lines history file.",
+        metavar="HISTORY_FILE",
+        dest="history",
+    )
+    run_parser.add_argument(
+        "--tag",
+        help="Label stored with the runs in the history file.",
+        metavar="TAG",
+        dest="tag",
+    )
+
+    compare_parser = commands.add_parser(
+        "compare",
+        help="Compare the latest run of every function in a history file with its baseline. Exits 1 if any is significantly slower.",
+        description="Compare the latest run of every function in a history file with its baseline: the latest run tagged --baseline, or else the latest run of a different version of its source. Exits 1 if any function is significantly slower.",
+    )
+    compare_parser.add_argument(
+        "history_file",
+        help="JSON-lines history written with FunctionPerformanceComparator(history=...).",
+        metavar="HISTORY_FILE",
+    )
+    compare_parser.add_argument(
+        "-b",
+        "--baseline",
+        help="Tag of the baseline runs. Defaults to the previous version of each function.",
+        metavar="TAG",
+        dest="baseline_tag",
+    )
+    compare_parser.add_argument(
+        "-a",
+        "--alpha",
+        type=float,
+        default=0.05,
+        help="Significance level of the Mann-Whitney U test. Defaults to 0.05.",
+        metavar="ALPHA",
+        dest="alpha",
+    )
+    compare_parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=0.05,
+        help="Relative slowdown of the median that is tolerated. Defaults to 0.05.",
+        metavar="FRACTION",
+        dest="threshold",
+    )
+    compare_parser.add_argument(
+        "--host",
+        help="Only compare runs of this host. Defaults to every host.",
+        metavar="HOST",
+        dest="host",
+    )
+
+    args = parser.parse_args(sys.argv[1:])
+    if args.command == "run":
+        run_options: Dict[str, Any] = {
+            option: getattr(args, option)
+            for option in ("time_budget", "rounds", "iterations", "isolation", "memory", "concurrency", "history", "tag")
+            if getattr(args, option) is not None
+        }
+        sys.exit(run_benchmarks(args.targets, args.pattern, run_options, args.json_file))
+    if args.command == "compare":
+        sys.exit(
+            compare_history(
+                args.history_file, args.baseline_tag, args.alpha, args.threshold, args.host
+            )
+        )
@@ -0,0 +1,629 @@
+#!/usr/bin/env python
+"""Indexed queries over text logs written by setup_logger.
+
+Records are expected in the setup_logger text format, optionally with the call-site prefix that
+UtilsClass.log_message/_print_status add to the message, which _print_status follows with a
+second one naming the class:
+
+    [asctime] [levelname] - {filename} - method:lineno - message
+    [asctime] [levelname] - {filename} - method:lineno - {filename} - Class.method:lineno - message
+
+Lines that do not start with "[asctime] [levelname]" continue the previous record (tracebacks,
+iterdict trees). The log is memory-mapped and split into blocks of about --block-bytes bytes,
+each starting at a record boundary. A sidecar index "<LOG_FILE>.idx" keeps one zone map per
+block: its byte range, time range, levels and call sites. A query only scans the blocks whose
+zone map can match, plus the tail of the file that is not indexed yet.
+
+The index is extended from where it stopped each time the tool runs. It is rebuilt when the log
+shrinks or its first bytes change, e.g. after setup_logger truncated or rotated it.
+
+Usage:
+    python log_query.py LOG_FILE [--level LEVELS] [--since TIME] [--until TIME] [--site SITE]
+                        [--contains TEXT] [--json] [--count] [--rebuild]
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+import time
+from argparse import ArgumentParser
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Match,
+    NamedTuple,
+    Optional,
+    Pattern,
+    Set,
+    Tuple,
+)
+
+INDEX_VERSION: int = 1
+INDEX_SUFFIX: str = ".idx"
+DEFAULT_BLOCK_BYTES: int = 1 << 16
+DEFAULT_DATE_FORMAT: str = "%Y-%m-%d %H:%M:%S"
+# Bytes hashed to recognize a log that was replaced by a new file of at least the same size.
+HEAD_BYTES: int = 4096
+# Blocks with more distinct call sites than this store None, i.e. "may contain any site".
+MAX_SITES_PER_BLOCK: int = 256
+
+_HEADER: Pattern[bytes] = re.compile(
+    rb"^\[(?P<asctime>[^\]\n]+)\] \[(?P<levelname>[^\]\n]+?) *\] - ", re.MULTILINE
+)
+_CALL_SITE: Pattern[bytes] = re.compile(
+    rb" *\{(?P<filename>[^}\n]*)\} - (?P<method>[^\s:]+):(?P<lineno>\d+) - "
+)
+
+
+class LogRecordView(NamedTuple):
+
+    """Record found by a query. offset/end are the record's byte range in the log file."""
+
+    offset: int
+    end: int
+    created: float
+    asctime: str
+    levelname: str
+    filename: Optional[str]
+    method_name: Optional[str]
+    lineno: Optional[int]
+    class_name: Optional[str]
+    message: str
+    text: str
+
+    @property
+    def call_site(self) -> Optional[str]:
+        """"filename:method:lineno", or None if the record has no call-site prefix."""
+        if self.filename is None:
+            return None
+        return f"{self.filename}:{self.method_name}:{self.lineno}"
+
+
+class Block(NamedTuple):
+
+    """Zone map of a run of complete records."""
+
+    start: int
+    end: int
+    min_created: float
+    max_created: float
+    levels: List[str]
+    # ids into LogIndex.sites, None if the block has more than MAX_SITES_PER_BLOCK of them
+    sites: Optional[List[int]]
+    n_records: int
+
+
+class LogIndex:
+
+    """Sidecar block index of a setup_logger text log."""
+
+    def __init__(
+        self,
+        log_file: str,
+        date_format: str = DEFAULT_DATE_FORMAT,
+        block_bytes: int = DEFAULT_BLOCK_BYTES,
+    ) -> None:
+        """Class initializer. Loads the sidecar index if it matches the log, see update().
+
+        Args:
+            log_file (str): log written by setup_logger
+            date_format (str, optional): date format the log was written with. Defaults to the setup_logger default.
+            block_bytes (int, optional): approximate size of an indexed block. Defaults to 64 KiB.
+        """
+        self.log_file: str = log_file
+        self.index_file: str = log_file + INDEX_SUFFIX
+        self.date_format: str = date_format
+        self.block_bytes: int = max(1, int(block_bytes))
+        self.blocks: List[Block] = []
+        self.sites: List[str] = []
+        self.indexed_size: int = 0
+        self.head_digest: str = ""
+        self._site_ids: Dict[str, int] = {}
+        self._prefix_site_ids: Dict[bytes, int] = {}
+        # asctime bytes -> epoch seconds; consecutive records mostly share a second
+        self._created_cache: Tuple[bytes, float] = (b"", 0.0)
+        self._load()
+
+    # region Index Maintenance
+    def _load(self) -> None:
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as index_file:
+                data: Dict[str, Any] = json.load(index_file)
+        except (OSError, ValueError):
+            return
+        if (
+            data.get("version") != INDEX_VERSION
+            or data.get("date_format") != self.date_format
+            or data.get("block_bytes") != self.block_bytes
+        ):
+            return
+        self.blocks = [Block(*block) for block in data["blocks"]]
+        self.sites = data["sites"]
+        self._site_ids = {site: site_id for site_id, site in enumerate(self.sites)}
+        self.indexed_size = data["indexed_size"]
+        self.head_digest = data["head_digest"]
+
+    def _save(self) -> None:
+        data: Dict[str, Any] = {
+            "version": INDEX_VERSION,
+            "date_format": self.date_format,
+            "block_bytes": self.block_bytes,
+            "indexed_size": self.indexed_size,
+            "head_digest": self.head_digest,
+            "sites": self.sites,
+            "blocks": [list(block) for block in self.blocks],
+        }
+        partial_name: str = self.index_file + ".part"
+        with open(partial_name, "w", encoding="utf-8") as index_file:
+            json.dump(data, index_file, separators=(",", ":"))
+        os.replace(partial_name, self.index_file)
+
+    def _reset(self) -> None:
+        self.blocks = []
+        self.sites = []
+        self._site_ids = {}
+        self._prefix_site_ids = {}
+        self.indexed_size = 0
+        self.head_digest = ""
+
+    @staticmethod
+    def _digest(data: mmap.mmap, size: int) -> str:
+        return hashlib.sha1(data[: min(size, HEAD_BYTES)]).hexdigest()
+
+    def update(self, data: mmap.mmap, rebuild: bool = False) -> int:
+        """Indexes the complete records appended since the last update. The last record of the file is left unindexed, since more continuation lines may still be appended to it.
+
+        Args:
+            data (mmap.mmap): mapped log file
+            rebuild (bool, optional): discard the existing index first. Defaults to False.
+
+        Returns:
+            int: number of blocks added
+        """
+        size: int = len(data)
+        if (
+            rebuild
+            or size < self.indexed_size
+            or (self.indexed_size and self._digest(data, self.indexed_size) != self.head_digest)
+        ):
+            self._reset()
+        n_blocks_before: int = len(self.blocks)
+
+        block_start: Optional[int] = None
+        min_created: float = 0.0
+        max_created: float = 0.0
+        levels: Set[bytes] = set()
+        sites: Optional[Set[int]] = set()
+        n_records: int = 0
+        created_of: Callable[[bytes], float] = self._created
+        site_id_of: Callable[[bytes, int], int] = self._site_id
+        for header in _HEADER.finditer(data, self.indexed_size):
+            offset: int = header.start()
+            if block_start is not None and offset - block_start >= self.block_bytes:
+                self._add_block(block_start, offset, min_created, max_created, levels, sites, n_records)
+                block_start = None
+            asctime, levelname = header.groups()
+            created: float = created_of(asctime)
+            if block_start is None:
+                block_start = offset
+                min_created = max_created = created
+                levels = set()
+                sites = set()
+                n_records = 0
+            elif created < min_created:
+                min_created = created
+            elif created > max_created:
+                max_created = created
+            levels.add(levelname)
+            if sites is not None:
+                sites.add(site_id_of(data, header.end()))
+                if len(sites) > MAX_SITES_PER_BLOCK:
+                    sites = None
+            n_records += 1
+        # The open block, including the last record, is indexed by a later update.
+
+        if len(self.blocks) > n_blocks_before or not self.head_digest:
+            if self.blocks:
+                self.indexed_size = self.blocks[-1].end
+                self.head_digest = self._digest(data, self.indexed_size)
+            self._save()
+        return len(self.blocks) - n_blocks_before
+
+    def _add_block(
+        self,
+        start: int,
+        end: int,
+        min_created: float,
+        max_created: float,
+        levels: Set[bytes],
+        sites: Optional[Set[int]],
+        n_records: int,
+    ) -> None:
+        self.blocks.append(
+            Block(
+                start,
+                end,
+                min_created,
+                max_created,
+                sorted(levelname.decode("utf-8", "replace") for levelname in levels),
+                sorted(sites) if sites is not None else None,
+                n_records,
+            )
+        )
+
+    def _site_id(self, data: mmap.mmap, offset: int) -> int:
+        """Returns the id of the call site whose prefix starts at offset, "" if there is none."""
+        call_site: Optional[Match[bytes]] = _CALL_SITE.match(data, offset)
+        # The padded prefix is identical for every record of a call site.
+        prefix: bytes = call_site.group(0) if call_site is not None else b""
+        site_id: Optional[int] = self._prefix_site_ids.get(prefix)
+        if site_id is not None:
+            return site_id
+        site: str = (
+            b":".join(call_site.group("filename", "method", "lineno")).decode("utf-8", "replace")
+            if call_site is not None
+            else ""
+        )
+        site_id = self._site_ids.get(site)
+        if site_id is None:
+            site_id = self._site_ids[site] = len(self.sites)
+            self.sites.append(site)
+        self._prefix_site_ids[prefix] = site_id
+        return site_id
+
+    def _created(self, asctime: bytes) -> float:
+        """Parses asctime with date_format as local time. Unparsable timestamps map to 0."""
+        cached_asctime, cached_created = self._created_cache
+        if asctime == cached_asctime:
+            return cached_created
+        created: float = parse_time(asctime.decode("utf-8", "replace"), self.date_format)
+        self._created_cache = (asctime, created)
+        return created
+
+    # endregion Index Maintenance
+
+    # region Queries
+    def query(
+        self,
+        data: mmap.mmap,
+        levels: Optional[Set[str]] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        site: Optional[str] = None,
+        contains: Optional[str] = None,
+    ) -> Iterator[LogRecordView]:
+        """Yields the records matching every given filter, in file order. Call update() first to index recent records; unindexed records are still found, by scanning.
+
+        Args:
+            data (mmap.mmap): mapped log file
+            levels (Optional[Set[str]], optional): level names to keep. Defaults to all.
+            since (Optional[float], optional): earliest epoch time to keep. Defaults to None.
+            until (Optional[float], optional): latest epoch time to keep. Defaults to None.
+            site (Optional[str], optional): "filename", "filename:method" or "filename:method:lineno" prefix of the call site. Defaults to any.
+            contains (Optional[str], optional): substring the record text must contain. Defaults to None.
+
+        Yields:
+            LogRecordView: matching records
+        """
+        # site id -> True if it matches site; extended as the scan finds new sites
+        site_matches: List[bool] = [
+            _site_matches(indexed_site, site) for indexed_site in self.sites
+        ] if site is not None else []
+        site_ids: Optional[Set[int]] = (
+            {site_id for site_id, matches in enumerate(site_matches) if matches}
+            if site is not None
+            else None
+        )
+        needle: Optional[bytes] = contains.encode("utf-8") if contains is not None else None
+
+        ranges: List[Tuple[int, int]] = []
+        for block in self.blocks:
+            if since is not None and block.max_created < since:
+                continue
+            if until is not None and block.min_created > until:
+                continue
+            if levels is not None and levels.isdisjoint(block.levels):
+                continue
+            if site_ids is not None and block.sites is not None and site_ids.isdisjoint(block.sites):
+                continue
+            if needle is not None and data.find(needle, block.start, block.end) < 0:
+                continue
+            if ranges and ranges[-1][1] == block.start:
+                ranges[-1] = (ranges[-1][0], block.end)
+            else:
+                ranges.append((block.start, block.end))
+        indexed_end: int = self.blocks[-1].end if self.blocks else 0
+        if indexed_end < len(data):
+            ranges.append((indexed_end, len(data)))
+
+        level_names: Optional[Set[bytes]] = (
+            {level.encode("utf-8") for level in levels} if levels is not None else None
+        )
+        for start, end in ranges:
+            for header, record_end in _record_spans(data, start, end):
+                asctime, levelname = header.groups()
+                if level_names is not None and levelname not in level_names:
+                    continue
+                if since is not None or until is not None:
+                    created: float = self._created(asctime)
+                    if since is not None and created < since:
+                        continue
+                    if until is not None and created > until:
+                        continue
+                if needle is not None and data.find(needle, header.start(), record_end) < 0:
+                    continue
+                if site is not None:
+                    site_id: int = self._site_id(data, header.end())
+                    if site_id >= len(site_matches):
+                        site_matches.extend(
+                            _site_matches(indexed_site, site)
+                            for indexed_site in self.sites[len(site_matches) :]
+                        )
+                    if not site_matches[site_id]:
+                        continue
+                yield self._view(data, header, record_end)
+
+    def _view(self, data: mmap.mmap, header: Match[bytes], end: int) -> LogRecordView:
+        """Decodes the record whose header is header and that ends at end. Both call-site prefixes of a _print_status record are kept out of its message."""
+        call_site: Optional[Match[bytes]] = _CALL_SITE.match(data, header.end(), end)
+        message_start: int = call_site.end() if call_site is not None else header.end()
+        class_name: Optional[str] = None
+        if call_site is not None:
+            class_site: Optional[Match[bytes]] = _CALL_SITE.match(data, message_start, end)
+            # _print_status repeats the call site as "{filename} - Class.method:lineno"
+            if (
+                class_site is not None
+                and class_site.group("filename", "lineno") == call_site.group("filename", "lineno")
+                and class_site.group("method").endswith(b"." + call_site.group("method"))
+            ):
+                class_name = class_site.group("method")[
+                    : -len(call_site.group("method")) - 1
+                ].decode("utf-8", "replace")
+                message_start = class_site.end()
+        asctime, levelname = header.groups()
+        return LogRecordView(
+            offset=header.start(),
+            end=end,
+            created=self._created(asctime),
+            asctime=asctime.decode("utf-8", "replace"),
+            levelname=levelname.decode("utf-8", "replace"),
+            filename=call_site.group("filename").decode("utf-8", "replace") if call_site else None,
+            method_name=call_site.group("method").decode("utf-8", "replace") if call_site else None,
+            lineno=int(call_site.group("lineno")) if call_site else None,
+            class_name=class_name,
+            message=data[message_start:end].decode("utf-8", "replace").rstrip("\n"),
+            text=data[header.start() : end].decode("utf-8", "replace").rstrip("\n"),
+        )
+
+    # endregion Queries
+
+
+def _record_spans(
+    data: mmap.mmap, start: int, end: int
+) -> Iterator[Tuple[Match[bytes], int]]:
+    """Yields the header of every record starting in [start, end) and the offset its record ends at, i.e. where the next header starts."""
+    previous: Optional[Match[bytes]] = None
+    for header in _HEADER.finditer(data, start, end):
+        if previous is not None:
+            yield previous, header.start()
+        previous = header
+    if previous is not None:
+        yield previous, end
+
+
+def _site_matches(indexed_site: str, site: str) -> bool:
+    """True if site names indexed_site or a prefix of it made of whole ":"-separated parts."""
+    return indexed_site == site or indexed_site.startswith(site + ":")
+
+
+def parse_time(text: str, date_format: str = DEFAULT_DATE_FORMAT) -> float:
+    """Parses a local time written with date_format, or epoch seconds, to epoch seconds. Returns 0 if text matches neither."""
+    try:
+        return time.mktime(time.strptime(text, date_format))
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return 0.0
+
+
+def open_log(log_file: str) -> Tuple[Any, mmap.mmap]:
+    """Opens and memory-maps a log file. Close both returned objects when done.
+
+    Raises:
+        ValueError: if the file is empty (empty files cannot be mapped)
+
+    Returns:
+        Tuple[IO[bytes], mmap.mmap]: the open file and its read-only mapping
+    """
+    file_object = open(log_file, "rb")
+    try:
+        if os.fstat(file_object.fileno()).st_size == 0:
+            raise ValueError(f"{log_file} is empty")
+        return file_object, mmap.mmap(file_object.fileno(), 0, access=mmap.ACCESS_READ)
+    except BaseException:
+        file_object.close()
+        raise
+
+
+def to_json(record: LogRecordView) -> str:
+    """Renders a record as one JSON line, with the fields binary_log.py uses."""
+    fields: Dict[str, Any] = {
+        "asctime": record.asctime,
+        "created": record.created,
+        "levelname": record.levelname,
+        "filename": record.filename,
+        "method": record.method_name,
+        "lineno": record.lineno,
+        "class_name": record.class_name,
+        "message": record.message,
+        "offset": record.offset,
+    }
+    return json.dumps(fields, ensure_ascii=False)
+
+
+def main(
+    log_file: str,
+    levels: Optional[str],
+    since: Optional[str],
+    until: Optional[str],
+    site: Optional[str],
+    contains: Optional[str],
+    as_json: bool,
+    count_only: bool,
+    rebuild: bool,
+    date_format: str,
+    block_bytes: int,
+) -> int:
+    try:
+        index: LogIndex = LogIndex(log_file, date_format=date_format, block_bytes=block_bytes)
+        if os.path.getsize(log_file) == 0:
+            # setup_logger truncates the log when it opens it, so nothing was logged yet
+            if count_only:
+                print(0, file=sys.stdout)
+            return 0
+        file_object, data = open_log(log_file)
+    except (OSError, ValueError) as e:
+        print(f"Exception: {e}", file=sys.stderr)
+        return -1
+    try:
+        index.update(data, rebuild=rebuild)
+        n_matches: int = 0
+        for record in index.query(
+            data,
+            levels={level.strip().upper() for level in levels.split(",")} if levels else None,
+            since=parse_time(since, date_format) if since is not None else None,
+            until=parse_time(until, date_format) if until is not None else None,
+            site=site,
+            contains=contains,
+        ):
+            n_matches += 1
+            if count_only:
+                continue
+            if as_json:
+                print(to_json(record), file=sys.stdout)
+            else:
+                print(record.text, file=sys.stdout)
+        if count_only:
+            print(n_matches, file=sys.stdout)
+    except BrokenPipeError:
+        pass
+    except OSError as e:
+        print(f"Exception: {e}", file=sys.stderr)
+        return -1
+    finally:
+        data.close()
+        file_object.close()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        prog=os.path.basename(__file__),
+        usage="%(prog)s [options] LOG_FILE",
+        description="Query a setup_logger text log through an incrementally updated sidecar index.",
+        prefix_chars="-",
+        add_help=True,
+    )
+    parser.add_argument(
+        "log_file",
+        help="Text log file to query.",
+        metavar="LOG_FILE",
+    )
+    parser.add_argument(
+        "-l",
+        "--level",
+        help="Comma-separated level names to keep, e.g. WARNING,ERROR. Defaults to all levels.",
+        metavar="LEVELS",
+        dest="levels",
+    )
+    parser.add_argument(
+        "-s",
+        "--since",
+        help="Keep records at or after this time, in the log's date format or as epoch seconds.",
+        metavar="TIME",
+        dest="since",
+    )
+    parser.add_argument(
+        "-u",
+        "--until",
+        help="Keep records at or before this time, in the log's date format or as epoch seconds.",
+        metavar="TIME",
+        dest="until",
+    )
+    parser.add_argument(
+        "-c",
+        "--site",
+        help="Keep records from this call site: FILE, FILE:METHOD or FILE:METHOD:LINE.",
+        metavar="SITE",
+        dest="site",
+    )
+    parser.add_argument(
+        "-t",
+        "--contains",
+        help="Keep records whose text contains TEXT.",
+        metavar="TEXT",
+        dest="contains",
+    )
+    parser.add_argument(
+        "-j",
+        "--json",
+        help="Output one JSON object per record instead of text. Defaults to False.",
+        dest="as_json",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-n",
+        "--count",
+        help="Only print the number of matching records. Defaults to False.",
+        dest="count_only",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-r",
+        "--rebuild",
+        help="Rebuild the sidecar index from scratch. Defaults to False.",
+        dest="rebuild",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-d",
+        "--date-format",
+        default=DEFAULT_DATE_FORMAT,
+        help="strftime format the log was written with. Defaults to the setup_logger default.",
+        metavar="DATEFMT",
+        dest="date_format",
+    )
+    parser.add_argument(
+        "-b",
+        "--block-bytes",
+        type=int,
+        default=DEFAULT_BLOCK_BYTES,
+        help="Approximate bytes per index block. Changing it rebuilds the index. Defaults to 65536.",
+        metavar="N",
+        dest="block_bytes",
+    )
+
+    args = parser.parse_args(sys.argv[1:])
+    sys.exit(
+        main(
+            args.log_file,
+            args.levels,
+            args.since,
+            args.until,
+            args.site,
+            args.contains,
+            args.as_json,
+            args.count_only,
+            args.rebuild,
+            args.date_format,
+            args.block_bytes,
+        )
+    )
@@ -1,15 +1,33 @@
 #!/usr/bin/env python
 
+from __future__ import annotations
+
+import atexit
+import contextlib
+import copy
 import functools
+import itertools
+import json
 import logging
+import logging.handlers
+import math
 import os
-from collections.abc import Mapping
-from inspect import Traceback, currentframe, getframeinfo, stack
-from types import FrameType
+import queue
+import re
+import sys
+import threading
+import time
+from collections.abc import Mapping, MutableMapping, Sequence
+from types import CodeType, FrameType, ModuleType
 from typing import *
-from typing import Optional, Type
+from typing import TYPE_CHECKING, Optional, Type
 
-import numpy as np
+# numpy, omegaconf and PyQt5 are only imported where they are needed, so importing this
+# module stays cheap for scripts that just want the logger.
+if TYPE_CHECKING:
+    import numpy as np
+    from omegaconf import DictConfig
+    from PyQt5.QtCore import QMutex
 
 try:
     from arepl_dump import dump
@@ -18,9 +36,6 @@ except ImportError:
         pass
 
 
-from omegaconf import DictConfig
-from PyQt5.QtCore import QMutex, pyqtBoundSignal, pyqtSignal
-
 # Set True to log messages to console:
 global DEBUG_ENABLED
 DEBUG_ENABLED: bool = False
@@ -51,11 +66,54 @@ FLAG: int = logging.getLevelName("FLAG")
 logging.captureWarnings(True)
 
 
+class _DefaultLoggingConfig(dict):
+    """dict with attribute access, standing in for a DictConfig when setup_logger gets no cfg so omegaconf is not imported."""
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
 def setup_logger(
     cfg: Optional[DictConfig] = None, root_logger: bool = False
 ) -> Optional[logging.Logger]:
     """Creates a logging.Logger object to use across various scripts/modules. You must pass root_logger=True if you want to have console reporting. Pass cfg.logging hydra config to customize formatting, date format, etc.
 
+    Loggers are registered per (cfg contents, root_logger, resolved out_file): repeat calls, from any module, return the logger configured the first time instead of opening files and adding handlers again. A call with a different cfg for the same logger replaces the handlers the previous call attached. A plain text out_file is truncated only if no earlier sink in this process, rotating or binary included, opened the same path; otherwise it is appended to.
+
+    Set cfg.out_file_format to "binary" to write cfg.out_file as compact, append-only binary records instead of text (see binary_log.py to decode them), or to "json" to write one JSON object per record with the fields of cfg.format (see JsonLinesFormatter). Set cfg.stream_format to "json" for the same on the console.
+
+    Set cfg.queue to hand records to a background thread instead of writing them on the calling thread:
+
+        queue:
+          enabled: true         # defaults to true when the queue section is present
+          max_size: 10000       # bound on queued records
+          overflow: block       # block | drop_oldest | drop_new
+          batch_size: 256       # max records written per handler flush
+
+    Set cfg.rotation to keep text and json out_files across runs and bound their size:
+
+        rotation:
+          enabled: true         # defaults to true when the rotation section is present
+          max_bytes: 104857600  # rotate before out_file grows past this size, 0 for no limit
+          interval: 86400       # rotate every interval seconds, 0 for no limit
+          backup_count: 10      # rotated segments kept, oldest deleted first, 0 keeps all
+          compress: true        # gzip rotated segments on a background thread
+          rotate_on_start: true # rotate the previous run's out_file instead of appending to it
+
+    In worker processes started with configure_worker_logging as initializer, no handlers are created: records are forwarded to the parent, which must call start_process_logging before starting the workers.
+
+    Set cfg.rate_limit to rate limit UtilsClass.log_message/_print_status per call site (applies to every logger, see UtilsClass.configure_rate_limit):
+
+        rate_limit:
+          enabled: true             # defaults to true when the rate_limit section is present
+          rate: 10                  # records per second per call site, omit for no rate limit
+          burst: 20                 # records a call site may emit back to back
+          collapse_duplicates: true # count identical consecutive messages instead of logging them
+          repeat_window: 30         # seconds before a repeated message is logged again
+
     Args:
         cfg (Optional[DictConfig], optional): cfg.logging (hydra) to control message/date formatting. If None, basic defaults are set. Defaults to None.
         root_logger (bool, optional): Flag to indicate a root logger is requested. Defaults to False.
@@ -67,11 +125,11 @@ def setup_logger(
         return
 
     caller_scriptname: str = os.path.basename(
-        getframeinfo(stack()[1][0]).filename
+        sys._getframe(1).f_code.co_filename
     ).split(".")[0]
     if cfg is None:
-        cfg = DictConfig(
-            content={
+        cfg = _DefaultLoggingConfig(
+            {
                 "name": __file__,
                 "level": logging.DEBUG,
                 "format": "[%(asctime)s] [%(levelname)-8s] - %(message)s",
@@ -79,27 +137,126 @@ def setup_logger(
             },
         )
 
+    out_file: Optional[str] = (
+        os.path.abspath(cfg.out_file) if "out_file" in cfg else None
+    )
+    registry_key: Hashable = (_freeze_cfg(cfg), root_logger, out_file)
+    with _configured_loggers_lock:
+        configured: Optional[
+            Tuple[logging.Logger, Tuple[logging.Handler, ...]]
+        ] = _configured_loggers.get(registry_key)
+        if configured is not None:
+            custom_logger, handlers = configured
+            if all(handler in custom_logger.handlers for handler in handlers):
+                return custom_logger
+
+        custom_logger, handlers = _configure_logger(cfg, root_logger, caller_scriptname)
+        for key, (logger, old_handlers) in list(_configured_loggers.items()):
+            if logger is custom_logger:
+                del _configured_loggers[key]
+                for handler in old_handlers:
+                    custom_logger.removeHandler(handler)
+                    handler.close()
+        _configured_loggers[registry_key] = (custom_logger, tuple(handlers))
+    return custom_logger
+
+
+# (frozen cfg, root_logger, absolute out_file) -> (logger, handlers setup_logger attached to it)
+_configured_loggers: Dict[
+    Hashable, Tuple[logging.Logger, Tuple[logging.Handler, ...]]
+] = {}
+_configured_loggers_lock: threading.Lock = threading.Lock()
+# absolute paths of every out_file setup_logger opened, any format or rotation; plain text sinks reopen them in "a" mode so earlier records survive
+_opened_log_files: Set[str] = set()
+
+
+def _freeze_cfg(cfg: Any) -> Hashable:
+    """Converts a (nested) cfg into a hashable registry key that ignores key order."""
+    if isinstance(cfg, Mapping):
+        return tuple(
+            sorted(
+                ((str(key), _freeze_cfg(value)) for key, value in cfg.items()),
+                key=lambda item: item[0],
+            )
+        )
+    if isinstance(cfg, Sequence) and not isinstance(cfg, (str, bytes)):
+        return tuple(_freeze_cfg(value) for value in cfg)
+    try:
+        hash(cfg)
+    except TypeError:
+        return repr(cfg)
+    return cfg
+
+
+def _configure_logger(
+    cfg: Mapping, root_logger: bool, caller_scriptname: str
+) -> Tuple[logging.Logger, List[logging.Handler]]:
+    """Configures the logger described by cfg. See setup_logger.
+
+    Returns:
+        Tuple[logging.Logger, List[logging.Handler]]: the logger and the handlers attached to it
+    """
     custom_logger: logging.Logger
+    if _worker_log_queue is not None:
+        # Worker processes write nothing themselves: records propagate to the root logger's ForwardingQueueHandler.
+        custom_logger = logging.getLogger() if root_logger else logging.getLogger(cfg.name)
+        custom_logger.propagate = not root_logger
+        custom_logger.setLevel(cfg.level)
+        return custom_logger, []
+
     if root_logger:
-        for handle in logging.getLogger().handlers:
+        for handle in list(logging.getLogger().handlers):
             logging.getLogger().removeHandler(handle)
+            if isinstance(handle, BoundedQueueHandler):
+                handle.stop()
         custom_logger = logging.getLogger()
         custom_logger.name = caller_scriptname
     else:
         custom_logger = logging.getLogger(cfg.name)
         custom_logger.parent = logging.getLogger(caller_scriptname)
 
-    file_handler: Optional[logging.FileHandler] = None
+    file_handler: Optional[logging.Handler] = None
     if "out_file" in cfg:
-        file_formatter = logging.Formatter(
-            fmt=cfg.format, datefmt=cfg.date_format)
-        file_handler = logging.FileHandler(filename=cfg.out_file, mode="w")
+        out_file: str = os.path.abspath(cfg.out_file)
+        out_file_format: str = cfg.get("out_file_format", "text")
+        if out_file_format == "binary":
+            from binary_log import BinaryLogHandler
+
+            file_handler = BinaryLogHandler(filename=cfg.out_file)
+        else:
+            file_formatter: logging.Formatter
+            if out_file_format == "json":
+                file_formatter = JsonLinesFormatter(
+                    fmt=cfg.format, datefmt=cfg.date_format
+                )
+            else:
+                file_formatter = logging.Formatter(
+                    fmt=cfg.format, datefmt=cfg.date_format)
+            rotation_cfg: Optional[Mapping] = cfg.get("rotation", None)
+            if rotation_cfg is not None and rotation_cfg.get("enabled", True):
+                file_handler = CompressingRotatingFileHandler(
+                    filename=cfg.out_file,
+                    max_bytes=rotation_cfg.get("max_bytes", 0),
+                    interval=rotation_cfg.get("interval", 0),
+                    backup_count=rotation_cfg.get("backup_count", 0),
+                    compress=rotation_cfg.get("compress", True),
+                    rotate_on_start=rotation_cfg.get("rotate_on_start", True),
+                )
+            else:
+                file_handler = logging.FileHandler(
+                    filename=out_file, mode="a" if out_file in _opened_log_files else "w"
+                )
+            file_handler.setFormatter(file_formatter)
         file_handler.setLevel(cfg.level)
-        file_handler.setFormatter(file_formatter)
+        _opened_log_files.add(out_file)
 
     stream_handler: Optional[logging.StreamHandler] = None
     if root_logger:
-        if LOG_COLORS:
+        if cfg.get("stream_format", "text") == "json":
+            stream_formatter = JsonLinesFormatter(
+                fmt=cfg.format, datefmt=cfg.date_format
+            )
+        elif LOG_COLORS:
             stream_formatter = LogMessageColorFormatter(
                 fmt=cfg.format, datefmt=cfg.date_format
             )
@@ -111,15 +268,40 @@ def setup_logger(
         stream_handler.setLevel(cfg.level)
         stream_handler.setFormatter(stream_formatter)
 
-    if file_handler is not None:
-        custom_logger.addHandler(file_handler)
-    if stream_handler is not None:
-        custom_logger.addHandler(stream_handler)
+    n_handlers_before: int = len(custom_logger.handlers)
+    output_handlers: List[logging.Handler] = [
+        handler for handler in (file_handler, stream_handler) if handler is not None
+    ]
+    queue_cfg: Optional[Mapping] = cfg.get("queue", None)
+    if output_handlers and queue_cfg is not None and queue_cfg.get("enabled", True):
+        custom_logger.addHandler(
+            BoundedQueueHandler.start(
+                output_handlers,
+                max_size=queue_cfg.get("max_size", 10000),
+                overflow=queue_cfg.get("overflow", "block"),
+                batch_size=queue_cfg.get("batch_size", 256),
+            )
+        )
+    else:
+        for handler in output_handlers:
+            custom_logger.addHandler(handler)
+
+    rate_limit_cfg: Optional[Mapping] = cfg.get("rate_limit", None)
+    if rate_limit_cfg is not None:
+        UtilsClass.configure_rate_limit(
+            rate=rate_limit_cfg.get("rate", None),
+            burst=rate_limit_cfg.get("burst", None),
+            collapse_duplicates=rate_limit_cfg.get("collapse_duplicates", True),
+            repeat_window=rate_limit_cfg.get("repeat_window", 30.0),
+            enabled=rate_limit_cfg.get("enabled", True),
+        )
 
     custom_logger.propagate = not root_logger
     custom_logger.setLevel(cfg.level)
 
-    return custom_logger
+    return custom_logger, custom_logger.handlers[n_handlers_before:]
+
+
 
 
 class Colors:
@@ -162,7 +344,7 @@ class Colors:
     # cancel SGR codes if we don't write to a terminal
     if not __import__("sys").stdout.isatty():
         for _ in dir():
-            if isinstance(_, str) and _[0] != "_":
+            if isinstance(_, str) and _[0] != "_" and _.isupper():
                 locals()[_] = ""
     else:
         # set Windows console in VT mode
@@ -172,8 +354,6 @@ class Colors:
             del kernel32
 
 
-Colors.test()
-
 
 class LogMessageColorFormatter(logging.Formatter):
 
@@ -183,6 +363,17 @@ class LogMessageColorFormatter(logging.Formatter):
         "[%(asctime)s] [%(levelname)-8s] {%(filename)-32s} - %(message)s"
     )
     _datetime_format: str = "%Y-%m-%d %H:%M:%S"
+    # level -> ANSI codes wrapped around the message format
+    _LEVEL_COLORS: Dict[int, Tuple[str, str]] = {
+        DEBUG: (Colors.LIGHT_WHITE, Colors.END),
+        INFO: (Colors.LIGHT_BLUE, Colors.END),
+        FAILURE: (Colors.RED + Colors.BOLD, Colors.END),
+        SUCCESS: (Colors.GREEN + Colors.BOLD, Colors.END),
+        WARNING: (Colors.YELLOW + Colors.BOLD, Colors.END),
+        ERROR: (Colors.RED + Colors.BOLD, Colors.END),
+        CRITICAL: (Colors.PURPLE + Colors.BOLD, Colors.END),
+        FLAG: (Colors.BOLD + Colors.LIGHT_RED, Colors.BLINK + Colors.END),
+    }  # Colors.NEGATIVE +
 
     def __init__(
         self, fmt: Optional[str] = None, datefmt: Optional[str] = None
@@ -198,6 +389,9 @@ class LogMessageColorFormatter(logging.Formatter):
             self._message_format = fmt
         if datefmt is not None:
             self._datetime_format = datefmt
+        self._formatters: Dict[int, logging.Formatter] = {}
+        self._plain_formatter: logging.Formatter
+        self._compile_formatters()
 
     @property
     def message_format(self) -> str:
@@ -216,6 +410,7 @@ class LogMessageColorFormatter(logging.Formatter):
             message_format (str): style for formatting messages in a LogRecord
         """
         self._message_format = message_format
+        self._compile_formatters()
 
     @property
     def datetime_format(self) -> str:
@@ -234,6 +429,7 @@ class LogMessageColorFormatter(logging.Formatter):
             new_datetime_format (str): style for formatting datetimes in a LogRecord
         """
         self._datetime_format = new_datetime_format
+        self._compile_formatters()
 
     def get_color_message(self, level_number: int) -> str:
         """generates a color-coded format for a LogRecord's message
@@ -244,33 +440,23 @@ class LogMessageColorFormatter(logging.Formatter):
         Returns:
             str: message string formatted with ANSI color codes
         """
-        FORMATS: Dict[int, str] = {
-            logging.DEBUG: Colors.LIGHT_WHITE + self._message_format + Colors.END,
-            logging.INFO: Colors.LIGHT_BLUE + self._message_format + Colors.END,
-            logging.getLevelName("FAILURE"): Colors.RED
-            + Colors.BOLD
-            + self._message_format
-            + Colors.END,
-            logging.getLevelName("SUCCESS"): Colors.GREEN
-            + Colors.BOLD
-            + self._message_format
-            + Colors.END,
-            logging.WARNING: Colors.YELLOW
-            + Colors.BOLD
-            + self._message_format
-            + Colors.END,
-            logging.ERROR: Colors.RED + Colors.BOLD + self._message_format + Colors.END,
-            logging.CRITICAL: Colors.PURPLE
-            + Colors.BOLD
-            + self._message_format
-            + Colors.END,
-            logging.getLevelName("FLAG"): Colors.BOLD
-            + Colors.LIGHT_RED
-            + self._message_format
-            + Colors.BLINK
-            + Colors.END,
-        }  # Colors.NEGATIVE +
-        return FORMATS[level_number]
+        color_prefix: str
+        color_suffix: str
+        color_prefix, color_suffix = self._LEVEL_COLORS[level_number]
+        return color_prefix + self._message_format + color_suffix
+
+    def _compile_formatters(self) -> None:
+        """Builds one logging.Formatter per level from the current message and datetime formats."""
+        self._formatters = {
+            level_number: logging.Formatter(
+                fmt=self.get_color_message(level_number),
+                datefmt=self._datetime_format,
+            )
+            for level_number in self._LEVEL_COLORS
+        }
+        self._plain_formatter = logging.Formatter(
+            fmt=self._message_format, datefmt=self._datetime_format
+        )
 
     def format(self, record: logging.LogRecord) -> str:
         """formats a LogRecord message with color
@@ -281,12 +467,680 @@ class LogMessageColorFormatter(logging.Formatter):
         Returns:
             str: formatted message string
         """
-        log_fmt: str = self.get_color_message(record.levelno)
-        formatter = logging.Formatter(
-            fmt=log_fmt, datefmt=self._datetime_format)
+        formatter: Optional[logging.Formatter] = self._formatters.get(record.levelno)
+        if formatter is None:
+            formatter = self._plain_formatter
         return formatter.format(record)
 
 
+class JsonLinesFormatter(logging.Formatter):
+
+    """Formats records as one JSON object per line for log aggregators.
+
+    The fields are the %(name)s fields of the text format string, in order, followed by the call site ("filename", "method", "lineno", "class_name") and "message". Records logged through UtilsClass report the call site resolved by _get_frame_info and the message without the padded call-site prefix. Padding and width specifiers of the format string are ignored.
+
+    Key fragments are encoded once per formatter, and values are appended straight to the output, so no dict is built per record.
+    """
+
+    _message_format: str = "[%(asctime)s] [%(levelname)-8s] - %(message)s"
+    _FIELD_PATTERN: Pattern[str] = re.compile(r"%\((\w+)\)")
+    # Fields reported through the call site, or as the final "message" field.
+    _CALL_SITE_FIELDS: Tuple[str, ...] = ("filename", "funcName", "lineno", "message")
+
+    def __init__(
+        self, fmt: Optional[str] = None, datefmt: Optional[str] = None
+    ) -> None:
+        """Class initializer.
+
+        Args:
+            fmt (Optional[str], optional): text format whose fields are reported. Defaults to the setup_logger format.
+            datefmt (Optional[str], optional): datetime format of "asctime". Defaults to None.
+        """
+        super().__init__(fmt=fmt or self._message_format, datefmt=datefmt)
+        fields: List[str] = []
+        for field in self._FIELD_PATTERN.findall(fmt or self._message_format):
+            if field not in fields and field not in self._CALL_SITE_FIELDS:
+                fields.append(field)
+        self._fields: Tuple[str, ...] = tuple(fields)
+        self._asctime_index: int = fields.index("asctime") if "asctime" in fields else -1
+        # '{"field":%s,...,"message":%s}': every key is encoded once, values are substituted pre-encoded
+        keys: List[str] = fields + ["filename", "method", "lineno", "class_name", "message"]
+        self._template: str = (
+            "{" + ",".join(json.dumps(key) + ":%s" for key in keys) + "}"
+        )
+        # asctime only changes once per second unless the default format adds milliseconds
+        self._asctime_cache: Tuple[int, str] = (-1, "")
+
+    def _asctime(self, record: logging.LogRecord) -> str:
+        if self.datefmt is None:
+            return self.formatTime(record)
+        seconds: int = int(record.created)
+        cached_seconds, cached_text = self._asctime_cache
+        if cached_seconds != seconds:
+            cached_text = self.formatTime(record, self.datefmt)
+            self._asctime_cache = (seconds, cached_text)
+        return cached_text
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Formats a LogRecord as a single JSON line.
+
+        Args:
+            record (logging.LogRecord): logging record to be formatted
+
+        Returns:
+            str: JSON object without a trailing newline
+        """
+        message: Any = record.msg
+        call_site: Tuple[str, str, int, Optional[str]]
+        body: str
+        if isinstance(message, _LogMessage):
+            call_site = message.call_site
+            body = message.body
+        else:
+            call_site = (record.filename, record.funcName, record.lineno, None)
+            body = record.getMessage()
+
+        record_dict: Dict[str, Any] = record.__dict__
+        values: List[str] = [
+            _encode_json_value(record_dict.get(field)) for field in self._fields
+        ]
+        if self._asctime_index >= 0:
+            values[self._asctime_index] = _encode_json_string(self._asctime(record))
+        values.extend(map(_encode_json_value, call_site))
+        values.append(_encode_json_string(body))
+        text: str = self._template % tuple(values)
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text or record.stack_info:
+            extra: str = ""
+            if record.exc_text:
+                extra += ',"exc_text":' + _encode_json_string(record.exc_text)
+            if record.stack_info:
+                extra += ',"stack_info":' + _encode_json_string(
+                    self.formatStack(record.stack_info)
+                )
+            text = text[:-1] + extra + "}"
+        return text
+
+
+# C-accelerated when available; keeps non-ASCII characters like json.dumps(ensure_ascii=False)
+_encode_json_string: Callable[[str], str] = json.encoder.encode_basestring
+
+
+def _encode_json_value(value: Any) -> str:
+    """Encodes a LogRecord attribute value as JSON. NaN and infinities, which JSON cannot represent, are encoded as null; values that are not JSON scalars are encoded as their str()."""
+    value_type: type = value.__class__
+    if value_type is str:
+        return _encode_json_string(value)
+    if value is None:
+        return "null"
+    if value_type is int:
+        return int.__repr__(value)
+    if value_type is bool:
+        return "true" if value else "false"
+    if value_type is float:
+        return float.__repr__(value) if math.isfinite(value) else "null"
+    return _encode_json_string(str(value))
+
+
+class CompressingRotatingFileHandler(logging.handlers.BaseRotatingHandler):
+
+    """File handler that rotates its file by size and/or age and gzips rotated segments on a background thread, so the logging thread only pays for a close and a rename.
+
+    Rotated segments are named "<filename>.<YYYYmmdd-HHMMSS>[.N][.gz]". When backup_count is set, the oldest segments beyond it are deleted after each rotation.
+    """
+
+    _SEGMENT_PATTERN: Pattern[str] = re.compile(r"\.(\d{8}-\d{6})(?:\.(\d+))?(\.gz)?$")
+
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = 0,
+        interval: float = 0,
+        backup_count: int = 0,
+        compress: bool = True,
+        rotate_on_start: bool = True,
+        encoding: Optional[str] = None,
+    ) -> None:
+        """Class initializer.
+
+        Args:
+            filename (str): file to log to. Opened in append mode.
+            max_bytes (int, optional): rotate before the file grows past this many bytes (measured in characters written). 0 disables size-based rotation. Defaults to 0.
+            interval (float, optional): rotate every interval seconds. 0 disables time-based rotation. Defaults to 0.
+            backup_count (int, optional): rotated segments to keep. 0 keeps all of them. Defaults to 0.
+            compress (bool, optional): gzip rotated segments on a background thread. Defaults to True.
+            rotate_on_start (bool, optional): rotate an existing non-empty file instead of appending to it. Defaults to True.
+            encoding (Optional[str], optional): file encoding. Defaults to None.
+        """
+        super().__init__(filename, mode="a", encoding=encoding, delay=True)
+        self.max_bytes: int = max(0, int(max_bytes))
+        self.interval: float = max(0.0, float(interval))
+        self.backup_count: int = max(0, int(backup_count))
+        self.compress: bool = compress
+        self._maintenance_queue: queue.Queue = queue.Queue()
+        self._maintenance_thread: Optional[threading.Thread] = None
+        self._segment_stem: str = ""
+        self._segment_counter: int = 0
+        self._bytes_written: int = (
+            os.path.getsize(self.baseFilename) if os.path.exists(self.baseFilename) else 0
+        )
+        self._rollover_at: float = math.inf
+        if rotate_on_start and self._bytes_written:
+            self.doRollover()
+        self._schedule_rollover()
+
+    def _schedule_rollover(self) -> None:
+        self._rollover_at = time.time() + self.interval if self.interval else math.inf
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        """Returns True if writing record would need a rotation first.
+
+        Args:
+            record (logging.LogRecord): record about to be written
+
+        Returns:
+            bool: True if the file is due for rotation
+        """
+        return self._is_due(len(self.format(record)) + len(self.terminator))
+
+    def _is_due(self, n_chars: int) -> bool:
+        if time.time() >= self._rollover_at:
+            return True
+        return bool(
+            self.max_bytes
+            and self._bytes_written
+            and self._bytes_written + n_chars > self.max_bytes
+        )
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Writes record, rotating first if it is due. The record is formatted once, and its length updates the size estimate instead of querying the file.
+
+        Args:
+            record (logging.LogRecord): record to write
+        """
+        try:
+            message: str = self.format(record) + self.terminator
+            if self._is_due(len(message)):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(message)
+            self.flush()
+            self._bytes_written += len(message)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def doRollover(self) -> None:
+        """Closes the file, renames it to a new segment and hands the segment to the background thread. The next record reopens the file."""
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename):
+            segment: str = self._segment_name()
+            os.replace(self.baseFilename, segment)
+            self._submit(segment)
+        self._bytes_written = 0
+        self._schedule_rollover()
+
+    def _segment_name(self) -> str:
+        """Returns an unused segment name. The counter only grows within a second, so a name pruned by the background thread is never handed out again."""
+        stem: str = f"{self.baseFilename}.{time.strftime('%Y%m%d-%H%M%S')}"
+        counter: int = self._segment_counter + 1 if stem == self._segment_stem else 0
+        segment: str = f"{stem}.{counter}" if counter else stem
+        while os.path.exists(segment) or os.path.exists(segment + ".gz"):
+            counter += 1
+            segment = f"{stem}.{counter}"
+        self._segment_stem, self._segment_counter = stem, counter
+        return segment
+
+    def _submit(self, segment: str) -> None:
+        if self._maintenance_thread is None:
+            self._maintenance_thread = threading.Thread(
+                target=self._maintain_segments,
+                name=f"{self.__class__.__name__}-{os.path.basename(self.baseFilename)}",
+                daemon=True,
+            )
+            self._maintenance_thread.start()
+        self._maintenance_queue.put(segment)
+
+    def _maintain_segments(self) -> None:
+        """Background thread loop. Deletes segments beyond backup_count, then compresses the rotated segment unless it was among them.
+
+        Pruning may delete segments that are still queued when rotations outpace compression; this thread is the only one deleting segments, so those are skipped when their turn comes.
+        """
+        while True:
+            segment: Optional[str] = self._maintenance_queue.get()
+            if segment is None:
+                return
+            try:
+                self._prune_segments()
+                if self.compress and os.path.exists(segment):
+                    self._gzip(segment)
+            except OSError as e:
+                sys.stderr.write(f"{self.__class__.__name__}: {segment}: {e}\n")
+
+    @staticmethod
+    def _gzip(segment: str) -> None:
+        import gzip
+        import shutil
+
+        partial_name: str = segment + ".gz.part"
+        with open(segment, "rb") as source, gzip.open(
+            partial_name, "wb", compresslevel=6
+        ) as target:
+            shutil.copyfileobj(source, target, 1 << 20)
+        os.replace(partial_name, segment + ".gz")
+        os.remove(segment)
+
+    def segments(self) -> List[str]:
+        """Returns the paths of the rotated segments, oldest first."""
+        directory: str = os.path.dirname(self.baseFilename)
+        prefix: str = os.path.basename(self.baseFilename)
+        found: List[Tuple[str, int, str]] = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.startswith(prefix):
+                    continue
+                match: Optional[Match[str]] = self._SEGMENT_PATTERN.fullmatch(
+                    entry.name, len(prefix)
+                )
+                if match is not None:
+                    found.append((match.group(1), int(match.group(2) or 0), entry.path))
+        return [path for _, _, path in sorted(found)]
+
+    def _prune_segments(self) -> None:
+        if not self.backup_count:
+            return
+        segments: List[str] = self.segments()
+        for segment in segments[: max(0, len(segments) - self.backup_count)]:
+            os.remove(segment)
+
+    def close(self) -> None:
+        """Closes the file and waits for the background thread to finish compressing pending segments."""
+        self.acquire()
+        try:
+            maintenance_thread: Optional[threading.Thread] = self._maintenance_thread
+            self._maintenance_thread = None
+        finally:
+            self.release()
+        if maintenance_thread is not None:
+            self._maintenance_queue.put(None)
+            maintenance_thread.join()
+        super().close()
+
+
+QUEUE_OVERFLOW_POLICIES: Tuple[str, ...] = ("block", "drop_oldest", "drop_new")
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+
+    """QueueListener that drains records in batches, so stream and file handlers write and flush once per batch instead of once per record."""
+
+    def __init__(
+        self, log_queue: queue.Queue, *handlers: logging.Handler, batch_size: int = 256
+    ) -> None:
+        """Class initializer.
+
+        Args:
+            log_queue (queue.Queue): queue filled by a BoundedQueueHandler or ForwardingQueueHandler
+            *handlers (logging.Handler): handlers that receive the records
+            batch_size (int, optional): max records taken from the queue per write. Defaults to 256.
+        """
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size: int = max(1, int(batch_size))
+        # multiprocessing.Queue has no task_done
+        self._has_task_done: bool = hasattr(log_queue, "task_done")
+
+    def enqueue_sentinel(self) -> None:
+        """Blocks until the stop sentinel fits in the queue, so every record queued before stop() is written."""
+        self.queue.put(self._sentinel)
+
+    def _monitor(self) -> None:
+        """Background thread loop. Collects up to batch_size records per wakeup and writes them as one batch."""
+        log_queue: queue.Queue = self.queue
+        while True:
+            batch: List[logging.LogRecord] = []
+            stopping: bool = False
+            record: Optional[logging.LogRecord] = log_queue.get()
+            while True:
+                if record is self._sentinel:
+                    stopping = True
+                else:
+                    batch.append(record)
+                if self._has_task_done:
+                    log_queue.task_done()
+                if stopping or len(batch) >= self.batch_size:
+                    break
+                try:
+                    record = log_queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self.handle_batch(batch)
+            if stopping:
+                break
+
+    def handle_batch(self, records: List[logging.LogRecord]) -> None:
+        """Passes a batch of records to every handler whose level accepts them. Rotating handlers get one record at a time, so they can rotate between records.
+
+        Args:
+            records (List[logging.LogRecord]): records taken from the queue
+        """
+        records = [self.prepare(record) for record in records]
+        for handler in self.handlers:
+            accepted: List[logging.LogRecord] = [
+                record for record in records if record.levelno >= handler.level
+            ]
+            if not accepted:
+                continue
+            if (
+                isinstance(handler, logging.StreamHandler)
+                and not isinstance(handler, logging.handlers.BaseRotatingHandler)
+                and handler.stream is not None
+            ):
+                self._write_batch(handler, accepted)
+            else:
+                for record in accepted:
+                    handler.handle(record)
+
+    @staticmethod
+    def _write_batch(
+        handler: logging.StreamHandler, records: List[logging.LogRecord]
+    ) -> None:
+        """Formats records and writes them to a StreamHandler with a single write and flush."""
+        chunks: List[str] = []
+        for record in records:
+            if not handler.filter(record):
+                continue
+            try:
+                chunks.append(handler.format(record) + handler.terminator)
+            except Exception:
+                handler.handleError(record)
+        if not chunks:
+            return
+        handler.acquire()
+        try:
+            handler.stream.write("".join(chunks))
+            handler.flush()
+        except Exception:
+            handler.handleError(records[-1])
+        finally:
+            handler.release()
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+
+    """QueueHandler backed by a bounded queue. When the queue is full, records are handled according to the overflow policy:
+
+    block: wait for the listener to make room
+    drop_oldest: discard the oldest queued record
+    drop_new: discard the incoming record
+    """
+
+    _active: List["BoundedQueueHandler"] = []
+    _active_lock: threading.Lock = threading.Lock()
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = "block") -> None:
+        """Class initializer.
+
+        Args:
+            log_queue (queue.Queue): bounded queue drained by a BatchingQueueListener
+            overflow (str, optional): one of QUEUE_OVERFLOW_POLICIES. Defaults to "block".
+        """
+        if overflow not in QUEUE_OVERFLOW_POLICIES:
+            raise ValueError(
+                f"overflow must be one of {QUEUE_OVERFLOW_POLICIES}, not {overflow!r}"
+            )
+        super().__init__(log_queue)
+        self.overflow: str = overflow
+        self.listener: Optional[BatchingQueueListener] = None
+        self.dropped_oldest: int = 0
+        self.dropped_new: int = 0
+        self._drop_lock: threading.Lock = threading.Lock()
+
+    @classmethod
+    def start(
+        cls,
+        handlers: List[logging.Handler],
+        max_size: int = 10000,
+        overflow: str = "block",
+        batch_size: int = 256,
+    ) -> "BoundedQueueHandler":
+        """Creates a queue handler and starts a background listener writing to handlers. Active listeners are flushed and stopped at interpreter exit.
+
+        Args:
+            handlers (List[logging.Handler]): handlers to write to from the background thread
+            max_size (int, optional): max number of queued records. Defaults to 10000.
+            overflow (str, optional): one of QUEUE_OVERFLOW_POLICIES. Defaults to "block".
+            batch_size (int, optional): max records written per flush. Defaults to 256.
+
+        Returns:
+            BoundedQueueHandler: handler to attach to a logger
+        """
+        log_queue: queue.Queue = queue.Queue(maxsize=max(1, int(max_size)))
+        queue_handler: BoundedQueueHandler = cls(log_queue, overflow=overflow)
+        queue_handler.listener = BatchingQueueListener(
+            log_queue, *handlers, batch_size=batch_size
+        )
+        queue_handler.listener.start()
+        with cls._active_lock:
+            if not cls._active:
+                atexit.register(stop_queued_logging)
+            cls._active.append(queue_handler)
+        return queue_handler
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Keeps the _LogMessage of records from UtilsClass, so the handlers behind the queue still see the call site and monotonic timestamp. Other records are rendered by QueueHandler.prepare.
+
+        Args:
+            record (logging.LogRecord): record logged on the calling thread
+
+        Returns:
+            logging.LogRecord: record to queue
+        """
+        return _detach_log_record(record) or super().prepare(record)
+
+    @property
+    def dropped_records(self) -> int:
+        """Total number of records discarded by the overflow policy."""
+        return self.dropped_oldest + self.dropped_new
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Puts a record on the queue, applying the overflow policy if it is full.
+
+        Args:
+            record (logging.LogRecord): prepared record
+        """
+        if self.overflow == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if self.overflow == "drop_new":
+            with self._drop_lock:
+                self.dropped_new += 1
+            return
+        while True:
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                with self._drop_lock:
+                    self.dropped_oldest += 1
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                continue
+
+    def stop(self) -> None:
+        """Writes all queued records, stops the listener thread and closes its handlers."""
+        with self._active_lock:
+            if self in self._active:
+                self._active.remove(self)
+        listener: Optional[BatchingQueueListener] = self.listener
+        self.listener = None
+        if listener is None:
+            return
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        if self.dropped_records:
+            sys.stderr.write(
+                f"{self.__class__.__name__}: dropped {self.dropped_oldest} oldest and {self.dropped_new} new records ({self.overflow})\n"
+            )
+
+    def close(self) -> None:
+        self.stop()
+        super().close()
+
+
+def stop_queued_logging() -> None:
+    """Flushes and stops every background listener started by setup_logger. Registered with atexit when the first one starts."""
+    with BoundedQueueHandler._active_lock:
+        active_handlers: List[BoundedQueueHandler] = list(BoundedQueueHandler._active)
+    for queue_handler in active_handlers:
+        queue_handler.stop()
+
+
+# Queue to the parent's ProcessLogListener when this process is a logging worker (see configure_worker_logging).
+_worker_log_queue: Optional[Any] = None
+_process_log_listener: Optional["ProcessLogListener"] = None
+
+
+class ForwardingQueueHandler(logging.handlers.QueueHandler):
+
+    """Worker-side handler that sends records to the parent process over a multiprocessing queue.
+
+    Records from UtilsClass keep their _LogMessage, rendered to plain text first, so the parent's handlers see the worker's call site and monotonic timestamp. Exception tracebacks are sent as text.
+    """
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Blocks while the queue is full, so no record is lost when the parent falls behind."""
+        self.queue.put(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Returns a picklable copy of record.
+
+        Args:
+            record (logging.LogRecord): record logged in the worker
+
+        Returns:
+            logging.LogRecord: copy without callables, %-args or traceback objects
+        """
+        return _detach_log_record(record) or super().prepare(record)
+
+
+class _ProcessRecordDispatcher(logging.Handler):
+
+    """Parent-side handler that passes a worker's record to the parent logger with the same name."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        root: logging.Logger = logging.getLogger()
+        target_logger: logging.Logger = (
+            root if record.name in ("root", root.name) else logging.getLogger(record.name)
+        )
+        if target_logger.isEnabledFor(record.levelno):
+            target_logger.handle(record)
+
+
+class ProcessLogListener(BatchingQueueListener):
+
+    """Listener thread in the parent process that writes records forwarded by worker processes through the parent's own loggers and handlers, so a single process owns every log file."""
+
+    def __init__(self, log_queue: Any, batch_size: int = 256) -> None:
+        """Class initializer.
+
+        Args:
+            log_queue (multiprocessing.Queue): queue the workers' ForwardingQueueHandlers put records on
+            batch_size (int, optional): max records taken from the queue per wakeup. Defaults to 256.
+        """
+        super().__init__(log_queue, _ProcessRecordDispatcher(), batch_size=batch_size)
+
+
+def start_process_logging(
+    max_size: int = 10000, batch_size: int = 256, context: Optional[Any] = None
+) -> Any:
+    """Starts forwarding records from worker processes to the handlers setup_logger installed in this process. Pass the returned queue to configure_worker_logging in each worker, e.g.
+
+        log_queue = start_process_logging()
+        with ProcessPoolExecutor(initializer=configure_worker_logging, initargs=(log_queue,)) as executor:
+            ...
+        stop_process_logging()
+
+    Calling it again returns the queue of the running listener.
+
+    Args:
+        max_size (int, optional): max number of records in flight. Workers block when it is full. Defaults to 10000.
+        batch_size (int, optional): max records taken from the queue per wakeup. Defaults to 256.
+        context (Optional[multiprocessing.context.BaseContext], optional): multiprocessing context the workers are started with. Defaults to the default context.
+
+    Returns:
+        multiprocessing.Queue: queue to pass to configure_worker_logging
+    """
+    global _process_log_listener
+    if _process_log_listener is not None:
+        return _process_log_listener.queue
+    if context is None:
+        import multiprocessing
+
+        context = multiprocessing.get_context()
+    _process_log_listener = ProcessLogListener(
+        context.Queue(maxsize=max(1, int(max_size))), batch_size=batch_size
+    )
+    _process_log_listener.start()
+    atexit.register(stop_process_logging)
+    return _process_log_listener.queue
+
+
+def stop_process_logging() -> None:
+    """Writes every record the workers have sent and stops the listener. Shut down the worker pool first, so all records are in the queue."""
+    global _process_log_listener
+    listener: Optional[ProcessLogListener] = _process_log_listener
+    _process_log_listener = None
+    if listener is None:
+        return
+    atexit.unregister(stop_process_logging)
+    listener.stop()
+    listener.queue.close()
+    listener.queue.join_thread()
+
+
+def configure_worker_logging(log_queue: Any, level: int = DEBUG) -> None:
+    """Process pool initializer that sends every record of this process to the parent's ProcessLogListener.
+
+    Handlers inherited from a forked parent are detached without being closed, since they share the parent's open files. setup_logger calls made in the worker afterwards configure levels only and never open out_file.
+
+    Args:
+        log_queue (multiprocessing.Queue): queue returned by start_process_logging in the parent
+        level (int, optional): root logger level of the worker. Defaults to DEBUG.
+    """
+    global _worker_log_queue
+    _worker_log_queue = log_queue
+    with _configured_loggers_lock:
+        _configured_loggers.clear()
+    with BoundedQueueHandler._active_lock:
+        BoundedQueueHandler._active.clear()
+    for logger in list(logging.Logger.manager.loggerDict.values()):
+        if isinstance(logger, logging.Logger):
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+            logger.propagate = True
+    root: logging.Logger = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(ForwardingQueueHandler(log_queue))
+    root.setLevel(level)
+
+
 # endregion Custom Logging
 
 # region UtilsClass
@@ -315,12 +1169,15 @@ def class_decorator(decorator_func: Callable) -> Callable[..., Any]:
     """
 
     def decorator(cls) -> Callable[..., Any]:
+        # Qt signals can only exist if PyQt5 was already imported
+        qt_core: Optional[ModuleType] = sys.modules.get("PyQt5.QtCore")
+        signal_types: Tuple[type, ...] = (
+            (qt_core.pyqtSignal, qt_core.pyqtBoundSignal) if qt_core else ()
+        )
         # Iterate over all the attributes of the class
         for attr_name, attr_value in cls.__dict__.items():
             # Check if the attribute is a method
-            if callable(attr_value) and not isinstance(
-                attr_value, (pyqtSignal, pyqtBoundSignal)
-            ):
+            if callable(attr_value) and not isinstance(attr_value, signal_types):
                 # Apply the method decorator to the method
                 setattr(cls, attr_name, decorator_func(attr_value))
         return cls
@@ -354,11 +1211,296 @@ class ExceptionLoggingMeta(type):
         class_dict: Dict[str, object],
     ) -> "ExceptionLoggingMeta":
         for attr_name, attr_value in class_dict.items():
-            if callable(attr_value) and not attr_name.startswith("__"):
+            # staticmethod objects are callable as of Python 3.10, but wrapping them
+            # would turn them into plain functions that receive the instance
+            if (
+                callable(attr_value)
+                and not attr_name.startswith("__")
+                and not isinstance(attr_value, (staticmethod, classmethod))
+            ):
                 class_dict[attr_name] = exception_logger(attr_value)
         return super().__new__(cls, name, bases, class_dict)
 
 
+class _LogMessage:
+    """Message of a LogRecord emitted by UtilsClass. The padded call-site prefix, %-style args and callable messages are only rendered when a handler formats the record."""
+
+    __slots__ = (
+        "filename",
+        "method_name",
+        "lineno",
+        "status_msg",
+        "args",
+        "class_name",
+        "monotonic_ns",
+        "_body",
+        "_text",
+    )
+
+    def __init__(
+        self,
+        filename: str,
+        method_name: str,
+        lineno: int,
+        status_msg: Union[str, Callable[[], Any]],
+        args: Tuple[Any, ...] = (),
+        class_name: Optional[str] = None,
+    ) -> None:
+        self.filename: str = filename
+        self.method_name: str = method_name
+        self.lineno: int = lineno
+        self.status_msg: Union[str, Callable[[], Any]] = status_msg
+        self.args: Tuple[Any, ...] = args
+        self.class_name: Optional[str] = class_name
+        self.monotonic_ns: int = time.monotonic_ns()
+        self._body: Optional[str] = None
+        self._text: Optional[str] = None
+
+    @property
+    def call_site(self) -> Tuple[str, str, int, Optional[str]]:
+        """filename, method_name, line_number and class name (None for log_message) of the logging call."""
+        return self.filename, self.method_name, self.lineno, self.class_name
+
+    @property
+    def body(self) -> str:
+        """Message text without the call-site prefix."""
+        if self._body is None:
+            status_msg: Any = self.status_msg
+            if callable(status_msg):
+                status_msg = status_msg()
+            if self.args:
+                status_msg = f"{status_msg}" % self.args
+            self._body = f"{status_msg}"
+        return self._body
+
+    def detached(self, args: Optional[Tuple[Any, ...]] = None) -> "_LogMessage":
+        """Returns a copy with the body rendered, safe to pickle to another process or format on another thread.
+
+        Args:
+            args (Optional[Tuple[Any, ...]], optional): LogRecord args applied to the body, as LogRecord.getMessage would. Defaults to None.
+        """
+        body: str = self.body
+        if args:
+            body = body % args
+        message: _LogMessage = _LogMessage(
+            self.filename, self.method_name, self.lineno, body, (), self.class_name
+        )
+        message.monotonic_ns = self.monotonic_ns
+        return message
+
+    def __str__(self) -> str:
+        if self._text is None:
+            text: str = f"{f'{{{self.filename}}} - {self.method_name}:{self.lineno}':>64} - "
+            if self.class_name is not None:
+                text += f"{f'{{{self.filename}}} - {self.class_name}.{self.method_name}:{self.lineno}':>64} - "
+            self._text = text + self.body
+        return self._text
+
+
+def _detach_log_record(record: logging.LogRecord) -> Optional[logging.LogRecord]:
+    """Returns a copy of a UtilsClass record ready to be queued: its _LogMessage detached with the record's args merged in, and its traceback rendered to exc_text. Returns None for other records."""
+    message: Any = record.msg
+    if not isinstance(message, _LogMessage):
+        return None
+    record = copy.copy(record)
+    record.msg = message.detached(record.args)
+    record.args = None
+    if record.exc_info:
+        if not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+    return record
+
+
+class CallSiteRateLimiter:
+
+    """Token-bucket rate limiting and duplicate collapsing per log_message/_print_status call site.
+
+    Each call site (file, method, line) gets its own bucket holding up to burst tokens, refilled at rate tokens per second; records arriving with an empty bucket are dropped. With collapse_duplicates, a record whose message template and args equal the previous one from the same site within repeat_window seconds is dropped and counted. The counts are reported as one summary record before the next record the site emits, or by flush().
+
+    Decisions only compare the raw message template and args, so suppressed records are never formatted. Callable messages are never treated as duplicates, since comparing them would mean calling them.
+    """
+
+    __slots__ = (
+        "rate",
+        "burst",
+        "collapse_duplicates",
+        "repeat_window_ns",
+        "_sites",
+        "_lock",
+    )
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        collapse_duplicates: bool = True,
+        repeat_window: float = 30.0,
+    ) -> None:
+        """Class initializer.
+
+        Args:
+            rate (Optional[float], optional): records per second allowed per call site. None disables rate limiting. Defaults to None.
+            burst (Optional[float], optional): bucket size, i.e. records a call site may emit back to back. Defaults to max(1, rate).
+            collapse_duplicates (bool, optional): drop and count consecutive identical messages from a call site. Defaults to True.
+            repeat_window (float, optional): seconds after which a repeated message is emitted again along with its repeat count. Defaults to 30.0.
+        """
+        if rate is not None and rate <= 0:
+            raise ValueError(f"rate must be positive, not {rate}")
+        self.rate: Optional[float] = rate
+        self.burst: float = float(burst if burst is not None else max(1.0, rate or 1.0))
+        self.collapse_duplicates: bool = collapse_duplicates
+        self.repeat_window_ns: int = int(repeat_window * 1e9)
+        # call site -> [tokens, last refill ns, last message, last args, last emit ns, repeated, throttled, logger, level, class name]
+        self._sites: Dict[Tuple[str, str, int], List[Any]] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def admit(
+        self,
+        call_site: Tuple[str, str, int],
+        severity_level: int,
+        status_msg: Union[str, Callable[[], Any]],
+        args: Tuple[Any, ...],
+        logger: logging.Logger,
+        class_name: Optional[str] = None,
+    ) -> bool:
+        """Decides whether a record from call_site is emitted. Before admitting it, logs the summary of records the site had suppressed.
+
+        Returns:
+            bool: True if the record should be logged
+        """
+        now_ns: int = time.monotonic_ns()
+        summary: Optional[Tuple[int, int]] = None
+        with self._lock:
+            state: Optional[List[Any]] = self._sites.get(call_site)
+            if state is None:
+                state = self._sites[call_site] = [
+                    self.burst, now_ns, None, None, 0, 0, 0, logger, severity_level, class_name
+                ]
+            elif (
+                self.collapse_duplicates
+                and isinstance(status_msg, str)
+                and now_ns - state[4] < self.repeat_window_ns
+                and _same_message(state[2], state[3], status_msg, args)
+            ):
+                state[5] += 1
+                return False
+
+            if self.rate is not None:
+                state[0] = min(self.burst, state[0] + (now_ns - state[1]) * self.rate / 1e9)
+                state[1] = now_ns
+                if state[0] < 1.0:
+                    state[6] += 1
+                    return False
+                state[0] -= 1.0
+
+            if state[5] or state[6]:
+                summary = (state[5], state[6])
+                state[5] = state[6] = 0
+            state[2:5] = status_msg, args, now_ns
+            state[7:10] = logger, severity_level, class_name
+
+        if summary is not None:
+            _log_suppressed_summary(logger, severity_level, call_site, class_name, *summary)
+        return True
+
+    def flush(self) -> None:
+        """Logs the summaries of every call site with suppressed records that were not reported yet."""
+        pending: List[Tuple[Tuple[str, str, int], List[Any]]] = []
+        with self._lock:
+            for call_site, state in self._sites.items():
+                if state[5] or state[6]:
+                    pending.append((call_site, state[:]))
+                    state[5] = state[6] = 0
+        for call_site, state in pending:
+            _log_suppressed_summary(state[7], state[8], call_site, state[9], state[5], state[6])
+
+
+def _same_message(
+    last_msg: Any, last_args: Any, status_msg: str, args: Tuple[Any, ...]
+) -> bool:
+    """Compares message templates and args without formatting them. Args that cannot be compared (e.g. numpy arrays) never match."""
+    if last_msg is not status_msg and last_msg != status_msg:
+        return False
+    try:
+        return bool(last_args == args)
+    except Exception:
+        return False
+
+
+def _log_suppressed_summary(
+    logger: logging.Logger,
+    severity_level: int,
+    call_site: Tuple[str, str, int],
+    class_name: Optional[str],
+    repeated: int,
+    throttled: int,
+) -> None:
+    parts: List[str] = []
+    if repeated:
+        parts.append(f"last message repeated {repeated} times")
+    if throttled:
+        parts.append(f"{throttled} messages suppressed by rate limit")
+    logger.log(
+        severity_level,
+        _LogMessage(*call_site, ", ".join(parts), class_name=class_name),
+    )
+
+
+def _loaded_numpy() -> Optional[ModuleType]:
+    """Returns numpy if something already imported it. Values can only be numpy arrays if it was, so type checks never need to import it."""
+    return sys.modules.get("numpy")
+
+
+def iter_tree_lines(
+    d: Mapping,
+    level: int = 0,
+    max_depth: Optional[int] = None,
+    max_entries: Optional[int] = None,
+) -> Iterator[str]:
+    """Iteratively renders a nested mapping as tab-indented lines, one per entry. Mappings already on the current path are reported as cycles instead of being expanded again.
+
+    Args:
+        d (Mapping): mapping to render
+        level (int, optional): tab depth of the top-level entries. Defaults to 0.
+        max_depth (Optional[int], optional): number of nested levels to expand; deeper mappings are collapsed to their size. Defaults to None (unlimited).
+        max_entries (Optional[int], optional): max number of entries rendered before the output is truncated. Defaults to None (unlimited).
+
+    Yields:
+        str: one line per entry
+    """
+    numpy: Optional[ModuleType] = _loaded_numpy()
+    ndarray: Optional[type] = numpy.ndarray if numpy is not None else None
+    stack: List[Iterator[Tuple[Any, Any]]] = [iter(d.items())]
+    path_ids: List[int] = [id(d)]
+    n_entries: int = 0
+    while stack:
+        item: Optional[Tuple[Any, Any]] = next(stack[-1], None)
+        if item is None:
+            stack.pop()
+            path_ids.pop()
+            continue
+        k, v = item
+        indent: str = "\t" * (level + len(stack) - 1)
+        if max_entries is not None and n_entries >= max_entries:
+            yield f"{indent}... (truncated after {max_entries} entries)"
+            return
+        n_entries += 1
+        if isinstance(v, Mapping):
+            if id(v) in path_ids:
+                yield f"{indent}{k}: <cycle>"
+            elif max_depth is not None and len(stack) > max_depth:
+                yield f"{indent}{k}: {{...}} ({len(v)} entries)"
+            else:
+                yield f"{indent}{k}"
+                stack.append(iter(v.items()))
+                path_ids.append(id(v))
+        elif ndarray is not None and isinstance(v, ndarray):
+            yield f"{indent}{k}: ndarray(dtype={v.dtype}, shape={v.shape}, nbytes={v.nbytes})"
+        else:
+            yield f"{indent}{k}: {v}"
+
+
 # For memory profiling:
 # @class_decorator(profile)
 
@@ -397,144 +1539,652 @@ class UtilsClass(metaclass=ExceptionLoggingMeta):
 
     # endregion Class Properties
 
+    # Substrings of function names that belong to the logging machinery itself and
+    # are skipped when resolving the call site of a log message.
+    _FRAME_SKIP_NAMES: Tuple[str, ...] = (
+        "print_status",
+        "log_message",
+        "iterdict",
+        "get_frame_info",
+        "wrapper",
+    )
+    # Installed by configure_rate_limit; None means every enabled record is logged.
+    _rate_limiter: Optional[CallSiteRateLimiter] = None
+    # code object -> True if frames running it are skipped by _get_frame_info
+    _frame_skip_cache: Dict[CodeType, bool] = {}
+    # (code object, its filename, line number) -> (filename, method_name, line_number); code objects
+    # compare equal by content whatever file they come from, so the filename is part of the key
+    _frame_info_cache: Dict[Tuple[CodeType, str, int], Tuple[str, str, int]] = {}
+    # Both caches are cleared when they reach this size, so code compiled at runtime (exec, lambdas
+    # created in loops) can neither grow them forever nor be kept alive by them.
+    _FRAME_CACHE_MAX_SIZE: int = 4096
+
     @staticmethod
     def _get_frame_info() -> Tuple[str, str, int]:
         """Extracts frame info to be used for logging.
 
+        Call sites are cached on (code object, filename, line number), so repeat calls from the same line only cost a dict lookup. The caches are cleared once they hold _FRAME_CACHE_MAX_SIZE entries. Source lines are never read.
+
         Returns:
             Tuple: filename (str), method_name (str), line_number (int)
         """
-        curr_frame: Optional[FrameType] = currentframe()
-        frame: Optional[FrameType] = curr_frame and curr_frame.f_back
-
-        frame_info: Traceback = Traceback("", 0, "", [""], 0)
-        method_name: str = ""
-        invalid_fxns: List[str] = [
-            "print_status",
-            "log_message",
-            "iterdict",
-            "get_frame_info",
-            "wrapper",
-        ]
+        skip_cache: Dict[CodeType, bool] = UtilsClass._frame_skip_cache
+        frame: Optional[FrameType] = sys._getframe(1)
         while frame:
-            frame_info = getframeinfo(frame)
-            method_name = frame_info.function
-
-            if any(invalid_fxn in method_name.lower() for invalid_fxn in invalid_fxns):
-                frame = frame.f_back
-            else:
+            code: CodeType = frame.f_code
+            skip: Optional[bool] = skip_cache.get(code)
+            if skip is None:
+                method_name: str = code.co_name.lower()
+                skip = any(
+                    invalid_fxn in method_name
+                    for invalid_fxn in UtilsClass._FRAME_SKIP_NAMES
+                )
+                if len(skip_cache) >= UtilsClass._FRAME_CACHE_MAX_SIZE:
+                    skip_cache.clear()
+                skip_cache[code] = skip
+            if not skip:
                 break
+            frame = frame.f_back
 
-        if frame:
-            return os.path.basename(frame_info.filename), method_name, frame_info.lineno
-        else:
+        if not frame:
             return "", "", 0
 
+        key: Tuple[CodeType, str, int] = (frame.f_code, frame.f_code.co_filename, frame.f_lineno)
+        info_cache: Dict[Tuple[CodeType, str, int], Tuple[str, str, int]] = (
+            UtilsClass._frame_info_cache
+        )
+        frame_info: Optional[Tuple[str, str, int]] = info_cache.get(key)
+        if frame_info is None:
+            frame_info = (
+                os.path.basename(frame.f_code.co_filename),
+                frame.f_code.co_name,
+                frame.f_lineno,
+            )
+            if len(info_cache) >= UtilsClass._FRAME_CACHE_MAX_SIZE:
+                info_cache.clear()
+            info_cache[key] = frame_info
+        return frame_info
+
+    @staticmethod
+    def is_enabled_for(
+        severity_level: int, logger: Optional[logging.Logger] = None
+    ) -> bool:
+        """Checks whether a message at severity_level would be logged. Use it to guard work that is only needed to build a log message.
+
+        Args:
+            severity_level (int): logging level
+            logger (Optional[logging.Logger], optional): logger to check. Defaults to the root logger.
+
+        Returns:
+            bool: True if a message at severity_level would be logged.
+        """
+        if not DEBUG_ENABLED:
+            return False
+        return (logger or logging.getLogger().root).isEnabledFor(severity_level)
+
+    @staticmethod
+    def configure_rate_limit(
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        collapse_duplicates: bool = True,
+        repeat_window: float = 30.0,
+        enabled: bool = True,
+    ) -> Optional[CallSiteRateLimiter]:
+        """Installs per-call-site rate limiting and duplicate collapsing for log_message and _print_status of every class. See CallSiteRateLimiter for the arguments.
+
+        Pending suppression summaries of the replaced limiter are logged first, and again at interpreter exit for the new one.
+
+        Args:
+            enabled (bool, optional): False removes the current limiter. Defaults to True.
+
+        Returns:
+            Optional[CallSiteRateLimiter]: the installed limiter, or None if disabled
+        """
+        previous: Optional[CallSiteRateLimiter] = UtilsClass._rate_limiter
+        if previous is not None:
+            previous.flush()
+        else:
+            atexit.register(UtilsClass._flush_rate_limiter)
+        UtilsClass._rate_limiter = (
+            CallSiteRateLimiter(rate, burst, collapse_duplicates, repeat_window)
+            if enabled
+            else None
+        )
+        return UtilsClass._rate_limiter
+
+    @staticmethod
+    def _flush_rate_limiter() -> None:
+        if UtilsClass._rate_limiter is not None:
+            UtilsClass._rate_limiter.flush()
+
     @staticmethod
     def log_message(
-        status_msg: str,
+        status_msg: Union[str, Callable[[], Any]],
         severity_level: int = DEBUG,
+        *args: Any,
         logger: Optional[logging.Logger] = None,
     ) -> None:
-        """Logs message via logging module."""
+        """Logs message via logging module.
+
+        Nothing is done unless severity_level is enabled on the target logger and, if configure_rate_limit was called, the call site is within its rate limit. The message text is rendered lazily by the handlers, so pass %-style args after severity_level, or a callable returning the message, to skip building it for disabled levels.
+
+        Args:
+            status_msg (Union[str, Callable[[], Any]]): message, %-style format string or callable returning the message
+            severity_level (int, optional): logging level. Defaults to DEBUG.
+            *args (Any): %-style arguments for status_msg
+            logger (Optional[logging.Logger], optional): keyword-only logger to use. Defaults to the root logger.
+        """
         if not DEBUG_ENABLED:
             return
+        target_logger: Union[logging.Logger, logging.RootLogger] = (
+            logger or logging.getLogger().root
+        )
+        if not target_logger.isEnabledFor(severity_level):
+            return
+        call_site: Tuple[str, str, int] = UtilsClass._get_frame_info()
+        rate_limiter: Optional[CallSiteRateLimiter] = UtilsClass._rate_limiter
+        if rate_limiter is not None and not rate_limiter.admit(
+            call_site, severity_level, status_msg, args, target_logger
+        ):
+            return
         filename: str
         method_name: str
         lineno: int
-        filename, method_name, lineno = UtilsClass._get_frame_info()
-
-        msg: str = f"{f'{{{filename}}} - {method_name}:{lineno}':>64} - {status_msg}"
+        filename, method_name, lineno = call_site
 
-        target_logger: Union[logging.Logger, logging.RootLogger] = (
-            logger or logging.getLogger().root
+        target_logger.log(
+            severity_level,
+            _LogMessage(filename, method_name, lineno, status_msg, args),
         )
-        target_logger.log(level=severity_level, msg=msg)
 
-    def _print_status(self, status_msg: str, severity_level: int = DEBUG) -> None:
-        """Internal class logging implementation. Logs message via logging module with class-specific context."""
+    def _print_status(
+        self,
+        status_msg: Union[str, Callable[[], Any]],
+        severity_level: int = DEBUG,
+        *args: Any,
+    ) -> None:
+        """Internal class logging implementation. Logs message via logging module with class-specific context. See log_message for deferred formatting."""
         if not DEBUG_ENABLED:
             return
         if not self.logger:
             self.logger = logging.getLogger().root
+        if not self.logger.isEnabledFor(severity_level):
+            return
+        call_site: Tuple[str, str, int] = self._get_frame_info()
+        rate_limiter: Optional[CallSiteRateLimiter] = UtilsClass._rate_limiter
+        if rate_limiter is not None and not rate_limiter.admit(
+            call_site,
+            severity_level,
+            status_msg,
+            args,
+            self.logger,
+            self.__class__.__name__,
+        ):
+            return
         filename: str
         method_name: str
         lineno: int
-        filename, method_name, lineno = self._get_frame_info()
-        msg: str = f"{f'{{{filename}}} - {self.__class__.__name__}.{method_name}:{lineno}':>64} - {status_msg}"
-
-        self.log_message(msg, severity_level, self.logger)
+        filename, method_name, lineno = call_site
+
+        self.logger.log(
+            severity_level,
+            _LogMessage(
+                filename,
+                method_name,
+                lineno,
+                status_msg,
+                args,
+                class_name=self.__class__.__name__,
+            ),
+        )
 
-    def iterdict(self, d: Dict, level: int = 0) -> None:
-        """Recursively logs the information of a dictionary with each level tabbed once more. Note: if numpy array is dictionary value, only the shape is printed.
+    def iterdict(
+        self,
+        d: Mapping,
+        level: int = 0,
+        severity_level: int = DEBUG,
+        max_depth: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        chunk_lines: Optional[int] = None,
+    ) -> None:
+        """Logs the information of a dictionary as a tree with each level tabbed once more, in a single log record. Note: numpy arrays are summarized by dtype, shape and nbytes.
 
         Arguments:
-            d -- dictionary to be printed (dict)
+            d -- dictionary to be printed (Mapping)
 
         Keyword Arguments:
-            level -- Not user-specified. Used as tab depth.
-        """
-        for k, v in d.items():
-            if isinstance(v, dict):
-                self._print_status("\t" * level + f"{k}")
-                level += 1
-                self.iterdict(v, level)
-                level -= 1
-            else:
-                if isinstance(v, np.ndarray):
-                    self._print_status("\t" * level + f"{k}: {v.shape}")
-                else:
-                    self._print_status("\t" * level + f"{k}: {v}")
+            level -- tab depth of the top-level entries. Defaults to 0.
+            severity_level -- logging level. Defaults to DEBUG.
+            max_depth -- number of nested levels to expand; deeper mappings are collapsed. Defaults to None (unlimited).
+            max_entries -- max number of lines rendered. Defaults to None (unlimited).
+            chunk_lines -- stream the tree as one record per chunk_lines lines instead of a single record. Defaults to None.
+        """
+        if not DEBUG_ENABLED:
+            return
+        if not self.logger:
+            self.logger = logging.getLogger().root
+        if not self.logger.isEnabledFor(severity_level):
+            return
+        lines: Iterator[str] = iter_tree_lines(d, level, max_depth, max_entries)
+        if chunk_lines is None:
+            self._print_status("\n" + "\n".join(lines), severity_level)
+            return
+        chunk: List[str] = list(itertools.islice(lines, chunk_lines))
+        while chunk:
+            self._print_status("\n" + "\n".join(chunk), severity_level)
+            chunk = list(itertools.islice(lines, chunk_lines))
 
 
 # endregion UtilsClass
 
-# region Utility Functions
+# region Locks
+
 
+class LockStats:
 
-class LockCompatibleQMutex(QMutex):
-    """Wrapper class to make QMutex compatible with threading.Lock methods.
+    """Acquisition counts and wait/hold time histograms shared by all instrumented locks with the same name.
 
-    Detailed description: if you have a QMutex object, you can't use the threading.Lock methods acquire() and release(). This class is a wrapper around QMutex that allows you to use those methods.
+    Histogram bucket i counts durations whose nanosecond value has bit length i, i.e. durations in [2**(i-1), 2**i) ns.
     """
 
-    def __init__(self, *args, **kwargs) -> None:
-        super().__init__(*args, **kwargs)
+    N_BUCKETS: int = 64
+    _registry: Dict[str, "LockStats"] = {}
+    _registry_lock: threading.Lock = threading.Lock()
+
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+        self.acquisitions: int = 0
+        self.contended: int = 0
+        self.failed: int = 0
+        self.wait_ns: int = 0
+        self.hold_ns: int = 0
+        self.wait_histogram: List[int] = [0] * self.N_BUCKETS
+        self.hold_histogram: List[int] = [0] * self.N_BUCKETS
+        self._lock: threading.Lock = threading.Lock()
+
+    @classmethod
+    def for_name(cls, name: str) -> "LockStats":
+        """Returns the stats registered under name, creating them if needed."""
+        with cls._registry_lock:
+            stats: Optional[LockStats] = cls._registry.get(name)
+            if stats is None:
+                stats = cls._registry[name] = cls(name)
+            return stats
 
-    def acquire(self) -> None:
-        super().lock()
+    @classmethod
+    def all(cls) -> List["LockStats"]:
+        """Returns the stats of every named lock, sorted by total wait time."""
+        with cls._registry_lock:
+            return sorted(cls._registry.values(), key=lambda stats: -stats.wait_ns)
+
+    def record_acquire(self, wait_ns: int, contended: bool) -> None:
+        with self._lock:
+            self.acquisitions += 1
+            self.contended += contended
+            self.wait_ns += wait_ns
+            self.wait_histogram[min(wait_ns.bit_length(), self.N_BUCKETS - 1)] += 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failed += 1
+
+    def record_hold(self, hold_ns: int) -> None:
+        with self._lock:
+            self.hold_ns += hold_ns
+            self.hold_histogram[min(hold_ns.bit_length(), self.N_BUCKETS - 1)] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.acquisitions = self.contended = self.failed = 0
+            self.wait_ns = self.hold_ns = 0
+            self.wait_histogram = [0] * self.N_BUCKETS
+            self.hold_histogram = [0] * self.N_BUCKETS
+
+    @staticmethod
+    def histogram_percentile(histogram: List[int], fraction: float) -> int:
+        """Returns the upper bound in ns of the bucket holding the given fraction of samples (0 if empty)."""
+        total: int = sum(histogram)
+        if not total:
+            return 0
+        running: int = 0
+        for bucket, count in enumerate(histogram):
+            running += count
+            if running >= fraction * total:
+                return 1 << bucket
+        return 1 << (len(histogram) - 1)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.acquisitions} acquisitions ({self.contended} contended, {self.failed} failed), "
+            f"wait total {self.wait_ns / 1e6:.3f} ms p50<={self.histogram_percentile(self.wait_histogram, 0.5)} ns p99<={self.histogram_percentile(self.wait_histogram, 0.99)} ns, "
+            f"hold total {self.hold_ns / 1e6:.3f} ms p50<={self.histogram_percentile(self.hold_histogram, 0.5)} ns p99<={self.histogram_percentile(self.hold_histogram, 0.99)} ns"
+        )
+
+
+class _QMutexPrimitive:
+
+    """Adapts QMutex to the acquire/release/locked interface of threading.Lock."""
+
+    def __init__(self) -> None:
+        from PyQt5.QtCore import QMutex
+
+        self._mutex = QMutex()
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if not blocking:
+            return self._mutex.tryLock()
+        if timeout < 0:
+            self._mutex.lock()
+            return True
+        return self._mutex.tryLock(int(timeout * 1000))
 
     def release(self) -> None:
-        super().unlock()
+        self._mutex.unlock()
+
+    def locked(self) -> bool:
+        if self._mutex.tryLock():
+            self._mutex.unlock()
+            return False
+        return True
+
+
+class InstrumentedLock:
+
+    """threading.Lock-compatible lock that records acquisition counts and wait/hold time histograms in the LockStats of its name.
+
+    backend "qt" uses a QMutex, "threading" a threading.Lock. "auto" picks QMutex only if PyQt5 was already imported by the application, so non-Qt scripts never load it.
+    """
 
-    def locked(self, timeout: int = ...) -> bool:
-        """Returns True if the mutex is currently locked, False otherwise.
+    _unnamed_ids: Iterator[int] = itertools.count(1)
+
+    def __init__(self, name: str = "", backend: str = "auto") -> None:
+        """Class initializer.
 
         Args:
-            *args: timeout value to pass to QMutex.isLocked()
+            name (str, optional): name to aggregate stats under. Defaults to a new "InstrumentedLock-<n>" name that is never reused.
+            backend (str, optional): "auto", "qt" or "threading". Defaults to "auto".
+        """
+        if backend == "auto":
+            backend = "qt" if "PyQt5.QtCore" in sys.modules else "threading"
+        if backend not in ("qt", "threading"):
+            raise ValueError(f"backend must be 'auto', 'qt' or 'threading', not {backend!r}")
+        self.name: str = name or f"{self.__class__.__name__}-{next(self._unnamed_ids)}"
+        self.stats: LockStats = LockStats.for_name(self.name)
+        self._lock: Any = _QMutexPrimitive() if backend == "qt" else threading.Lock()
+        self._acquired_at: int = 0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        """Acquires the lock like threading.Lock.acquire, recording the wait time.
 
         Returns:
-            bool: True if the mutex is currently locked, False otherwise.
+            bool: True if the lock was acquired
         """
-        return super().tryLock(timeout)
+        start: int = time.perf_counter_ns()
+        contended: bool = False
+        acquired: bool = self._lock.acquire(False)
+        if not acquired and blocking:
+            contended = True
+            acquired = self._lock.acquire(True, timeout)
+        if not acquired:
+            self.stats.record_failure()
+            return False
+        self._acquired_at = time.perf_counter_ns()
+        self.stats.record_acquire(self._acquired_at - start, contended)
+        return True
+
+    def release(self) -> None:
+        """Releases the lock, recording how long it was held."""
+        hold_ns: int = time.perf_counter_ns() - self._acquired_at
+        self._lock.release()
+        self.stats.record_hold(hold_ns)
+
+    def locked(self) -> bool:
+        """Returns True if the lock is currently held. Never acquires it."""
+        return self._lock.locked()
 
     def __enter__(self) -> bool:
-        self.acquire()
-        return True
+        return self.acquire()
 
     def __exit__(self, *args) -> None:
+        self.release()
+
+
+class InstrumentedRWLock:
+
+    """Writer-preferring reader/writer lock built on threading primitives, for read-heavy shared state. Readers and writers are recorded in the LockStats named "<name>.read" and "<name>.write".
+
+    Neither side is reentrant: a thread holding the lock must not acquire it again.
+    """
+
+    _unnamed_ids: Iterator[int] = itertools.count(1)
+
+    def __init__(self, name: str = "") -> None:
+        """Class initializer.
+
+        Args:
+            name (str, optional): name to aggregate stats under. Defaults to a new "InstrumentedRWLock-<n>" name that is never reused.
         """
+        self.name: str = name or f"{self.__class__.__name__}-{next(self._unnamed_ids)}"
+        self.read_stats: LockStats = LockStats.for_name(f"{self.name}.read")
+        self.write_stats: LockStats = LockStats.for_name(f"{self.name}.write")
+        self._condition: threading.Condition = threading.Condition(threading.Lock())
+        self._readers: int = 0
+        self._writer: bool = False
+        self._waiting_writers: int = 0
+        self._read_started: threading.local = threading.local()
+        self._write_started: int = 0
+
+    def acquire_read(self) -> None:
+        start: int = time.perf_counter_ns()
+        contended: bool = False
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                contended = True
+                self._condition.wait()
+            self._readers += 1
+        self._read_started.ns = time.perf_counter_ns()
+        self.read_stats.record_acquire(self._read_started.ns - start, contended)
+
+    def release_read(self) -> None:
+        hold_ns: int = time.perf_counter_ns() - self._read_started.ns
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+        self.read_stats.record_hold(hold_ns)
+
+    def acquire_write(self) -> None:
+        start: int = time.perf_counter_ns()
+        contended: bool = False
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                contended = True
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        self._write_started = time.perf_counter_ns()
+        self.write_stats.record_acquire(self._write_started - start, contended)
+
+    def release_write(self) -> None:
+        hold_ns: int = time.perf_counter_ns() - self._write_started
+        with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+        self.write_stats.record_hold(hold_ns)
+
+    @contextlib.contextmanager
+    def read_locked(self) -> Iterator[None]:
+        """Context manager holding the lock for reading."""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextlib.contextmanager
+    def write_locked(self) -> Iterator[None]:
+        """Context manager holding the lock for writing."""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def _define_lock_compatible_qmutex() -> type:
+    """Imports PyQt5 and defines LockCompatibleQMutex on first access (see __getattr__)."""
+    from PyQt5.QtCore import QMutex
+
+    class LockCompatibleQMutex(QMutex):
+        """Wrapper class to make QMutex compatible with threading.Lock methods.
+
+        Detailed description: if you have a QMutex object, you can't use the threading.Lock methods acquire() and release(). This class is a wrapper around QMutex that allows you to use those methods.
+        """
+
+        def __init__(self, *args, **kwargs) -> None:
+            super().__init__(*args, **kwargs)
+
+        def acquire(self) -> None:
+            super().lock()
+
+        def release(self) -> None:
+            super().unlock()
+
+        def locked(self, timeout: int = 0) -> bool:
+            """Returns True if the mutex is currently locked, False otherwise. A free mutex is only held for the duration of the check.
+
+            Args:
+                timeout: milliseconds to wait for the mutex to become free. Defaults to 0.
+
+            Returns:
+                bool: True if the mutex is currently locked, False otherwise.
+            """
+            if super().tryLock(timeout):
+                super().unlock()
+                return False
+            return True
+
+        def __enter__(self) -> bool:
+            self.acquire()
+            return True
+
+        def __exit__(self, *args) -> None:
+            """
+            Args:
+                exc_type: Optional[type[BaseException]]
+                exc_value: Optional[BaseException]
+                traceback: Optional[TracebackType]
+            """
+            self.release()
+
+    return LockCompatibleQMutex
+
+
+def __getattr__(name: str) -> Any:
+    """Module attribute hook (PEP 562) defining PyQt5-backed classes on first access."""
+    if name == "LockCompatibleQMutex":
+        globals()[name] = _define_lock_compatible_qmutex()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# endregion Locks
+
+# region Utility Functions
+
+
+class BidirectionalMap(MutableMapping):
+    """dict-like mapping that keeps a reverse index of value -> keys, updated on every insert and delete. get_key/get_keys use the index instead of scanning the mapping.
+
+    Values must be hashable. Keys sharing a value are returned in the mapping's iteration order, like a dict scan would.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._data: Dict[Any, Any] = {}
+        # value -> {key: None} in insertion order of the keys
+        self._inverse: Dict[Any, Dict[Any, None]] = {}
+        # key -> insertion sequence number, used to restore key order within a value
+        self._order: Dict[Any, int] = {}
+        self._sequence: int = 0
+        # values whose keys were appended out of insertion order
+        self._unsorted: Set[Any] = set()
+        self.update(*args, **kwargs)
+
+    def __getitem__(self, key: Any) -> Any:
+        return self._data[key]
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        hash(value)
+        if key in self._data:
+            old_value: Any = self._data[key]
+            self._data[key] = value
+            if old_value is value or old_value == value:
+                return
+            self._remove_from_index(key, old_value)
+            keys: Dict[Any, None] = self._inverse.setdefault(value, {})
+            if keys:
+                self._unsorted.add(value)
+            keys[key] = None
+        else:
+            self._data[key] = value
+            self._order[key] = self._sequence
+            self._sequence += 1
+            self._inverse.setdefault(value, {})[key] = None
+
+    def __delitem__(self, key: Any) -> None:
+        value: Any = self._data.pop(key)
+        del self._order[key]
+        self._remove_from_index(key, value)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._data!r})"
+
+    def _remove_from_index(self, key: Any, value: Any) -> None:
+        keys: Dict[Any, None] = self._inverse[value]
+        del keys[key]
+        if not keys:
+            del self._inverse[value]
+            self._unsorted.discard(value)
+
+    def has_value(self, value: Any) -> bool:
+        """Returns True if any key maps to value. O(1)."""
+        try:
+            return value in self._inverse
+        except TypeError:
+            return False
+
+    def keys_for(self, value: Any) -> List[Any]:
+        """Returns the keys mapping to value in iteration order, or an empty list. O(number of matching keys).
+
         Args:
-            exc_type: Optional[type[BaseException]]
-            exc_value: Optional[BaseException]
-            traceback: Optional[TracebackType]
+            value (Any): value to look up
+
+        Returns:
+            List[Any]: keys mapping to value
         """
-        self.release()
+        try:
+            keys: Optional[Dict[Any, None]] = self._inverse.get(value)
+        except TypeError:
+            return []
+        if keys is None:
+            return []
+        if value in self._unsorted:
+            keys = dict.fromkeys(sorted(keys, key=self._order.__getitem__))
+            self._inverse[value] = keys
+            self._unsorted.discard(value)
+        return list(keys)
 
 
 def _get_keys(value_from: Any, this_map: Mapping) -> List[Optional[str]]:
     """Private prototype. Returns keys of a dictionary-like object (this_map) corresponding to value (val).
-    \n\nReturns an empty list if no matches are found.
+    \n\nReturns an empty list if no matches are found. BidirectionalMap lookups use its reverse index, other Mappings are scanned once.
 
     Args:
         value_from (Any): Value to search for in dictionary
@@ -543,16 +2193,25 @@ def _get_keys(value_from: Any, this_map: Mapping) -> List[Optional[str]]:
     Returns:
         List[Optional[str]]: List of keys corresponding to value_from. Empty list if no matches are found.
     """
+    if isinstance(this_map, BidirectionalMap):
+        if not this_map.has_value(value_from):
+            raise UserWarning(f"{value_from} not found in {this_map.values()}")
+        return [key for key in this_map.keys_for(value_from) if key is not None]
     if not isinstance(this_map, Mapping):
         raise TypeError(
             f"this_map must be a dictionary-like, not {type(this_map)}")
-    if value_from not in this_map.values():
+    found: bool = False
+    keys: List[Optional[str]] = []
+    for key, value in this_map.items():
+        if value_from == value:
+            found = True
+            if key is not None:
+                keys.append(key)
+        elif value is value_from:
+            found = True
+    if not found:
         raise UserWarning(f"{value_from} not found in {this_map.values()}")
-    return [
-        key
-        for key, value in this_map.items()
-        if value_from == value and key is not None
-    ]
+    return keys
 
 
 def get_key(value_from: Any, this_map: Any) -> Optional[str]:
@@ -565,10 +2224,8 @@ def get_key(value_from: Any, this_map: Any) -> Optional[str]:
     Returns:
         Optional[str]: First key corresponding to value. None if no match found.
     """
-    return (
-        _get_keys(value_from, this_map)[0] if _get_keys(
-            value_from, this_map) else None
-    )
+    keys: List[Optional[str]] = _get_keys(value_from, this_map)
+    return keys[0] if keys else None
 
 
 def get_keys(value_from: Any, this_map: Any) -> List[Optional[str]]:
@@ -584,6 +2241,189 @@ def get_keys(value_from: Any, this_map: Any) -> List[Optional[str]]:
     return _get_keys(value_from, this_map)
 
 
+def _raise_missing(missing: List[Any], this_map: Mapping) -> None:
+    if missing:
+        raise UserWarning(f"{missing} not found in {this_map.values()}")
+
+
+def _build_inverse(this_map: Mapping) -> Optional[Dict[Any, List[Any]]]:
+    """Builds value -> keys (None key excluded) in one pass over this_map. Returns None if a value is unhashable."""
+    inverse: Dict[Any, List[Any]] = {}
+    try:
+        for key, value in this_map.items():
+            keys: List[Any] = inverse.setdefault(value, [])
+            if key is not None:
+                keys.append(key)
+    except TypeError:
+        return None
+    return inverse
+
+
+def _is_numeric_array(values: Any) -> bool:
+    numpy: Optional[ModuleType] = _loaded_numpy()
+    return (
+        numpy is not None
+        and isinstance(values, numpy.ndarray)
+        and values.ndim == 1
+        and values.dtype.kind in "biuf"
+    )
+
+
+def _vectorized_lookup(
+    values_from: np.ndarray, this_map: Mapping, strict: bool
+) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """Resolves a numeric array against a mapping with numeric values using sorted search. Only called with numpy already imported.
+
+    Returns:
+        Optional[Tuple]: keys sorted by value (None keys excluded), first/last+1 index into them per value, mask of values with at least one non-None key. None if this_map's values are not numeric.
+    """
+    import numpy as np
+
+    keys: List[Any] = []
+    values: List[Any] = []
+    none_values: List[Any] = []
+    for key, value in this_map.items():
+        if key is None:
+            none_values.append(value)
+        else:
+            keys.append(key)
+            values.append(value)
+    map_values: np.ndarray = np.asarray(values)
+    if map_values.ndim != 1 or (values and map_values.dtype.kind not in "biuf"):
+        return None
+
+    order: np.ndarray = np.argsort(map_values, kind="stable")
+    sorted_values: np.ndarray = map_values[order]
+    key_array: np.ndarray
+    if keys and all(type(key) is type(keys[0]) for key in keys) and isinstance(
+        keys[0], (str, int, float)
+    ):
+        key_array = np.asarray(keys)
+    else:
+        key_array = np.empty(len(keys), dtype=object)
+        for i, key in enumerate(keys):
+            key_array[i] = key
+    sorted_keys: np.ndarray = key_array[order]
+
+    first: np.ndarray = np.searchsorted(sorted_values, values_from, side="left")
+    last: np.ndarray = np.searchsorted(sorted_values, values_from, side="right")
+    has_key: np.ndarray = last > first
+    if values_from.dtype.kind == "f":
+        has_key &= ~np.isnan(values_from)
+    if strict:
+        found: np.ndarray = has_key
+        if none_values:
+            found = found | np.isin(values_from, np.asarray(none_values))
+        _raise_missing(values_from[~found].tolist(), this_map)
+    return sorted_keys, first, last, has_key
+
+
+def get_keys_bulk(
+    values_from: Iterable[Any], this_map: Mapping, strict: bool = True
+) -> Union[List[List[Optional[str]]], List[np.ndarray]]:
+    """Returns the keys of this_map corresponding to each value in values_from. The mapping is inverted once per call instead of scanned once per value.
+
+    A 1-D numeric numpy array resolved against a mapping with numeric values takes a vectorized path and returns one key array per value.
+
+    Args:
+        values_from (Iterable[Any]): Values to search for in dictionary
+        this_map (Mapping): Dictionary-like object within which to search
+        strict (bool, optional): Raise UserWarning listing values not found in this_map, like get_keys. Otherwise they resolve to no keys. Defaults to True.
+
+    Returns:
+        Union[List[List[Optional[str]]], List[np.ndarray]]: keys per value, in the order of values_from
+    """
+    if not isinstance(this_map, Mapping):
+        raise TypeError(
+            f"this_map must be a dictionary-like, not {type(this_map)}")
+    if _is_numeric_array(values_from) and not isinstance(this_map, BidirectionalMap):
+        lookup = _vectorized_lookup(values_from, this_map, strict)
+        if lookup is not None:
+            sorted_keys, first, last, _ = lookup
+            return [
+                sorted_keys[start:stop] for start, stop in zip(first.tolist(), last.tolist())
+            ]
+        values_from = values_from.tolist()
+
+    values: List[Any] = list(values_from)
+    if isinstance(this_map, BidirectionalMap):
+        if strict:
+            _raise_missing([v for v in values if not this_map.has_value(v)], this_map)
+        return [
+            [key for key in this_map.keys_for(v) if key is not None] for v in values
+        ]
+
+    inverse: Optional[Dict[Any, List[Any]]] = _build_inverse(this_map)
+    if inverse is None:
+        # unhashable values in this_map: fall back to one scan per value
+        results: List[List[Optional[str]]] = []
+        missing: List[Any] = []
+        for v in values:
+            try:
+                results.append(_get_keys(v, this_map))
+            except UserWarning:
+                missing.append(v)
+                results.append([])
+        if strict:
+            _raise_missing(missing, this_map)
+        return results
+
+    results = []
+    missing = []
+    for v in values:
+        try:
+            keys: Optional[List[Any]] = inverse.get(v)
+        except TypeError:
+            keys = None
+        if keys is None:
+            missing.append(v)
+            results.append([])
+        else:
+            results.append(list(keys))
+    if strict:
+        _raise_missing(missing, this_map)
+    return results
+
+
+def get_key_bulk(
+    values_from: Iterable[Any], this_map: Mapping, strict: bool = True
+) -> Union[List[Optional[str]], np.ndarray]:
+    """Returns the first key of this_map corresponding to each value in values_from. See get_keys_bulk.
+
+    A 1-D numeric numpy array resolved against a mapping with numeric values returns a key array, with None (object dtype) where a value has no key.
+
+    Args:
+        values_from (Iterable[Any]): Values to search for in dictionary
+        this_map (Mapping): Dictionary-like object within which to search
+        strict (bool, optional): Raise UserWarning listing values not found in this_map, like get_key. Otherwise they resolve to None. Defaults to True.
+
+    Returns:
+        Union[List[Optional[str]], np.ndarray]: first key per value, in the order of values_from
+    """
+    if (
+        _is_numeric_array(values_from)
+        and isinstance(this_map, Mapping)
+        and not isinstance(this_map, BidirectionalMap)
+    ):
+        lookup = _vectorized_lookup(values_from, this_map, strict)
+        if lookup is not None:
+            import numpy as np
+
+            sorted_keys, first, _, has_key = lookup
+            if not len(sorted_keys):
+                return np.full(len(values_from), None, dtype=object)
+            first_keys: np.ndarray = sorted_keys[np.minimum(first, len(sorted_keys) - 1)]
+            if not has_key.all():
+                first_keys = first_keys.astype(object)
+                first_keys[~has_key] = None
+            return first_keys
+        values_from = values_from.tolist()
+    return [
+        keys[0] if len(keys) else None
+        for keys in get_keys_bulk(values_from, this_map, strict)
+    ]
+
+
 # endregion Utility Functions
 
 # region Testing
@@ -621,6 +2461,22 @@ class TestHarness(UtilsClass):
         self._print_status("self._print_status critical", CRITICAL)
         self._print_status("self._print_status flag", FLAG)
 
+    def test_deferred_logging(self) -> None:
+        def expensive_message() -> str:
+            raise AssertionError("message built for a disabled level")
+
+        previous_level: int = self.logger.level
+        self.logger.setLevel(INFO)
+        try:
+            assert not self.is_enabled_for(DEBUG, self.logger)
+            UtilsClass.log_message(expensive_message, DEBUG, logger=self.logger)
+            self._print_status(expensive_message, DEBUG)
+        finally:
+            self.logger.setLevel(previous_level)
+        self._print_status("self._print_status lazy %s %d", DEBUG, "args", 2)
+        self._print_status(lambda: "self._print_status lazy callable", DEBUG)
+        UtilsClass.log_message("UtilsClass.log_message lazy %s %d", DEBUG, "args", 2)
+
     def test_get_key(self) -> None:
         test_dict: Dict[Optional[str], str] = {
             "key1": "value1",
@@ -676,6 +2532,283 @@ class TestHarness(UtilsClass):
         except AssertionError as e:
             raise e
 
+    def test_bidirectional_map(self) -> None:
+        test_map: BidirectionalMap = BidirectionalMap(
+            key1="value1", key2="value5", key3="value5", key4="value4"
+        )
+        test_map[None] = "value6"
+        test_map["key5"] = "value5"
+        assert get_keys("value5", test_map) == [
+            "key2",
+            "key3",
+            "key5",
+        ], f"{get_keys('value5', test_map) = }"
+        test_map["key1"] = "value5"
+        del test_map["key3"]
+        assert get_keys("value5", test_map) == [
+            "key1",
+            "key2",
+            "key5",
+        ], f"{get_keys('value5', test_map) = }"
+        assert get_key("value6", test_map) is None, f"{get_key('value6', test_map) = }"
+        assert not test_map.has_value("value1"), f"{test_map = }"
+
+    def test_instrumented_lock(self) -> None:
+        lock: InstrumentedLock = InstrumentedLock("TestHarness.test_instrumented_lock")
+        lock.stats.reset()
+        counter: List[int] = [0]
+
+        def increment() -> None:
+            for _ in range(1000):
+                with lock:
+                    counter[0] += 1
+
+        threads: List[threading.Thread] = [
+            threading.Thread(target=increment) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert counter[0] == 4000, f"{counter[0] = }"
+        assert lock.stats.acquisitions == 4000, f"{lock.stats.acquisitions = }"
+        assert not lock.locked(), f"{lock.locked() = }"
+        assert sum(lock.stats.hold_histogram) == 4000, f"{lock.stats.hold_histogram = }"
+        self._print_status(lambda: f"{lock.stats}")
+
+    def test_instrumented_rw_lock(self) -> None:
+        rw_lock: InstrumentedRWLock = InstrumentedRWLock("TestHarness.test_instrumented_rw_lock")
+        rw_lock.read_stats.reset()
+        rw_lock.write_stats.reset()
+        n_readers: int = 4
+        # every reader waits inside read_locked for all the others, which only works if they hold it together
+        readers_inside: threading.Barrier = threading.Barrier(n_readers, timeout=5)
+        pair: List[int] = [0, 0]
+        torn_reads: List[Tuple[int, int]] = []
+        errors: List[BaseException] = []
+
+        def read() -> None:
+            try:
+                with rw_lock.read_locked():
+                    readers_inside.wait()
+                for _ in range(500):
+                    with rw_lock.read_locked():
+                        if pair[0] != pair[1]:
+                            torn_reads.append(tuple(pair))
+            except BaseException as e:
+                errors.append(e)
+
+        def write() -> None:
+            for _ in range(500):
+                with rw_lock.write_locked():
+                    pair[0] += 1
+                    time.sleep(0)
+                    pair[1] += 1
+
+        threads: List[threading.Thread] = [
+            threading.Thread(target=read) for _ in range(n_readers)
+        ] + [threading.Thread(target=write) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors, f"{errors = }"
+        assert not torn_reads, f"{torn_reads[:5] = }"
+        assert pair == [1000, 1000], f"{pair = }"
+        assert rw_lock.read_stats.acquisitions == n_readers * 501, f"{rw_lock.read_stats.acquisitions = }"
+        assert rw_lock.write_stats.acquisitions == 1000, f"{rw_lock.write_stats.acquisitions = }"
+        unnamed: List[str] = [InstrumentedRWLock().name, InstrumentedRWLock().name]
+        assert unnamed[0] != unnamed[1], f"{unnamed = }"
+        self._print_status(lambda: f"{rw_lock.read_stats}\n{rw_lock.write_stats}")
+
+    def test_rate_limit(self) -> None:
+        captured: logging.handlers.BufferingHandler = logging.handlers.BufferingHandler(
+            capacity=1 << 20
+        )
+        self.logger.addHandler(captured)
+        previous: Optional[CallSiteRateLimiter] = UtilsClass._rate_limiter
+        try:
+            UtilsClass.configure_rate_limit(rate=1e-3, burst=3)
+            for i in range(100):
+                self._print_status("self._print_status rate limited %d", DEBUG, i)
+            for _ in range(100):
+                self._print_status("self._print_status repeated", DEBUG)
+            UtilsClass._rate_limiter.flush()
+        finally:
+            self.logger.removeHandler(captured)
+            UtilsClass._rate_limiter = previous
+        bodies: List[str] = [record.msg.body for record in captured.buffer]
+        assert bodies == [
+            "self._print_status rate limited 0",
+            "self._print_status rate limited 1",
+            "self._print_status rate limited 2",
+            "self._print_status repeated",
+            "97 messages suppressed by rate limit",
+            "last message repeated 99 times",
+        ], f"{bodies = }"
+
+    def test_process_logging(self) -> None:
+        from concurrent.futures import ProcessPoolExecutor
+
+        logger_name: str = "TestHarness.test_process_logging"
+        n_tasks: int = 8
+        n_records: int = 2500
+        captured: logging.handlers.BufferingHandler = logging.handlers.BufferingHandler(
+            capacity=1 << 20
+        )
+        process_logger: logging.Logger = logging.getLogger(logger_name)
+        process_logger.addHandler(captured)
+        process_logger.propagate = False
+        log_queue: Any = start_process_logging()
+        try:
+            with ProcessPoolExecutor(
+                max_workers=4,
+                initializer=configure_worker_logging,
+                initargs=(log_queue,),
+            ) as executor:
+                worker_pids: Set[int] = set(
+                    executor.map(_log_burst, [logger_name] * n_tasks, [n_records] * n_tasks)
+                )
+        finally:
+            stop_process_logging()
+            process_logger.removeHandler(captured)
+        records: List[logging.LogRecord] = captured.buffer
+        assert len(records) == n_tasks * n_records, f"{len(records) = }"
+        assert {record.process for record in records} == worker_pids, f"{worker_pids = }"
+        assert os.getpid() not in worker_pids, f"{worker_pids = }"
+        call_sites: Set[Tuple[str, str, int, Optional[str]]] = {
+            record.msg.call_site[:2] for record in records
+        }
+        assert call_sites == {("python_toolbox.py", "_log_burst")}, f"{call_sites = }"
+        self._print_status(
+            "%d records from %d worker processes", DEBUG, len(records), len(worker_pids)
+        )
+
+    def test_json_queue_logging(self) -> None:
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as log_dir:
+            cfg: _DefaultLoggingConfig = _DefaultLoggingConfig(
+                {
+                    "name": "TestHarness.test_json_queue_logging",
+                    "level": logging.DEBUG,
+                    "format": "[%(asctime)s] [%(levelname)-8s] - %(message)s",
+                    "date_format": "%Y-%m-%d %H:%M:%S",
+                    "out_file": os.path.join(log_dir, "queued.jsonl"),
+                    "out_file_format": "json",
+                    "queue": {"max_size": 100},
+                }
+            )
+            queue_logger: logging.Logger = setup_logger(cfg)
+            queue_logger.propagate = False
+            UtilsClass.log_message("queued json %d", DEBUG, 1, logger=queue_logger)
+            harness_logger: logging.Logger = self.logger
+            self.logger = queue_logger
+            try:
+                self._print_status("queued json %s", DEBUG, "two")
+            finally:
+                self.logger = harness_logger
+            queue_handlers: List[logging.Handler] = list(queue_logger.handlers)
+            for handler in queue_handlers:
+                queue_logger.removeHandler(handler)
+                handler.close()
+            with open(cfg.out_file) as log_file:
+                records: List[Dict[str, Any]] = [json.loads(line) for line in log_file]
+        assert [record["message"] for record in records] == [
+            "queued json 1",
+            "queued json two",
+        ], f"{records = }"
+        assert {
+            (record["filename"], record["method"]) for record in records
+        } == {("python_toolbox.py", "test_json_queue_logging")}, f"{records = }"
+        assert records[1]["class_name"] == "TestHarness", f"{records = }"
+        encoded: List[str] = [
+            _encode_json_value(value) for value in (0.5, 1e300, math.nan, math.inf, -math.inf)
+        ]
+        assert json.loads(f"[{','.join(encoded)}]") == [0.5, 1e300, None, None, None], f"{encoded = }"
+
+    def test_setup_logger_registry(self) -> None:
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as log_dir:
+            cfg: _DefaultLoggingConfig = _DefaultLoggingConfig(
+                {
+                    "name": "TestHarness.test_setup_logger_registry",
+                    "level": logging.DEBUG,
+                    "format": "%(message)s",
+                    "date_format": "%Y-%m-%d %H:%M:%S",
+                    "out_file": os.path.join(log_dir, "registry.log"),
+                }
+            )
+            first_logger: logging.Logger = setup_logger(cfg)
+            first_logger.propagate = False
+            first_logger.debug("from the first caller")
+            # same cfg from another module
+            namespace: Dict[str, Any] = {"setup_logger": setup_logger, "cfg": cfg}
+            exec(compile("second_logger = setup_logger(cfg)", "other_module.py", "exec"), namespace)
+            second_logger: logging.Logger = namespace["second_logger"]
+            second_logger.debug("from the second caller")
+            assert second_logger is first_logger, f"{second_logger = }"
+            for handler in list(first_logger.handlers):
+                first_logger.removeHandler(handler)
+                handler.close()
+            with open(cfg.out_file) as log_file:
+                lines: List[str] = log_file.read().splitlines()
+            assert lines == ["from the first caller", "from the second caller"], f"{lines = }"
+            # a text sink opened after a rotating sink of the same path appends to it
+            rotating_cfg: _DefaultLoggingConfig = _DefaultLoggingConfig(
+                {
+                    **cfg,
+                    "name": "TestHarness.test_setup_logger_registry.rotating",
+                    "out_file": os.path.join(log_dir, "rotating.log"),
+                    "rotation": {"rotate_on_start": False, "compress": False},
+                }
+            )
+            text_cfg: _DefaultLoggingConfig = _DefaultLoggingConfig(
+                {**rotating_cfg, "name": "TestHarness.test_setup_logger_registry.text"}
+            )
+            del text_cfg["rotation"]
+            for sink_cfg in (rotating_cfg, text_cfg):
+                sink_logger: logging.Logger = setup_logger(sink_cfg)
+                sink_logger.propagate = False
+                sink_logger.debug(f"from {sink_cfg.name}")
+                for handler in list(sink_logger.handlers):
+                    sink_logger.removeHandler(handler)
+                    handler.close()
+            with open(rotating_cfg.out_file) as log_file:
+                lines = log_file.read().splitlines()
+            assert lines == [f"from {rotating_cfg.name}", f"from {text_cfg.name}"], f"{lines = }"
+
+    def test_rotating_file_handler(self) -> None:
+        import io
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as log_dir:
+            cfg: _DefaultLoggingConfig = _DefaultLoggingConfig(
+                {
+                    "name": "TestHarness.test_rotating_file_handler",
+                    "level": logging.DEBUG,
+                    "format": "%(message)s",
+                    "date_format": "%Y-%m-%d %H:%M:%S",
+                    "out_file": os.path.join(log_dir, "rotating.log"),
+                    "rotation": {"max_bytes": 2000, "backup_count": 3},
+                }
+            )
+            rotating_logger: logging.Logger = setup_logger(cfg)
+            rotating_logger.propagate = False
+            handler: CompressingRotatingFileHandler = rotating_logger.handlers[0]
+            maintenance_errors: io.StringIO = io.StringIO()
+            # rotations outpace compression, so pruning reaches segments still queued for gzip
+            with contextlib.redirect_stderr(maintenance_errors):
+                for i in range(500):
+                    rotating_logger.debug("rotated record %05d %s", i, "x" * 40)
+                rotating_logger.removeHandler(handler)
+                handler.close()
+            segments: List[str] = handler.segments()
+        assert not maintenance_errors.getvalue(), f"{maintenance_errors.getvalue() = }"
+        assert len(segments) == 3, f"{segments = }"
+        assert all(segment.endswith(".gz") for segment in segments), f"{segments = }"
+
     def test_exception_logger(self) -> None:
         try:
             pass
@@ -692,8 +2825,17 @@ class TestHarness(UtilsClass):
             bool: True if all tests pass.
         """
         self.test_logger()
+        self.test_deferred_logging()
         self.test_get_key()
         self.test_get_keys()
+        self.test_bidirectional_map()
+        self.test_instrumented_lock()
+        self.test_instrumented_rw_lock()
+        self.test_rate_limit()
+        self.test_process_logging()
+        self.test_json_queue_logging()
+        self.test_setup_logger_registry()
+        self.test_rotating_file_handler()
         self.test_exception_logger()
         return True
 
@@ -704,10 +2846,19 @@ class TestHarness(UtilsClass):
         return x
 
 
+def _log_burst(logger_name: str, n_records: int) -> int:
+    """Worker of TestHarness.test_process_logging. Returns the worker's pid."""
+    logger: logging.Logger = logging.getLogger(logger_name)
+    for i in range(n_records):
+        UtilsClass.log_message("worker record %d", DEBUG, i, logger=logger)
+    return os.getpid()
+
+
 # endregion Testing
 
 
 def main() -> None:
+    Colors.test()
     UtilsClass.log_message("This is a test message", severity_level=CRITICAL)
     test_harness: TestHarness = TestHarness()
     test_harness.throw_exception("-1")  # type: ignore
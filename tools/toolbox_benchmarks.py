@@ -0,0 +1,449 @@
+#!/usr/bin/env python
+"""Throughput and overhead benchmarks for python_toolbox.
+
+Reports formatter throughput, import time, and ns/call plus peak traced bytes/call of the logging call paths. Allocation counts are not reported: tracemalloc only sees blocks alive at the time it is queried, so blocks allocated and freed within a call cannot be counted.
+
+Usage:
+    python toolbox_benchmarks.py [--records N] [--calls N] [--depths 0,16,64] [--json]
+    python toolbox_benchmarks.py --import-only [--import-budget-ms MS]
+"""
+
+import gc
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+from python_toolbox import (
+    CRITICAL,
+    DEBUG,
+    ERROR,
+    FAILURE,
+    FLAG,
+    INFO,
+    SUCCESS,
+    WARNING,
+    JsonLinesFormatter,
+    LogMessageColorFormatter,
+    UtilsClass,
+)
+
+# region Formatter Throughput
+
+
+class _PerRecordColorFormatter(LogMessageColorFormatter):
+    """Reference implementation that builds a new logging.Formatter for every record, as LogMessageColorFormatter did before per-level formatters were precompiled."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        formatter = logging.Formatter(
+            fmt=self.get_color_message(record.levelno), datefmt=self.datetime_format
+        )
+        return formatter.format(record)
+
+
+def make_records(n_records: int) -> List[logging.LogRecord]:
+    """Creates LogRecords cycling through all toolbox levels.
+
+    Args:
+        n_records (int): number of records to create
+
+    Returns:
+        List[logging.LogRecord]: records ready to be formatted
+    """
+    levels: Tuple[int, ...] = (
+        DEBUG,
+        INFO,
+        SUCCESS,
+        FAILURE,
+        WARNING,
+        ERROR,
+        CRITICAL,
+        FLAG,
+    )
+    return [
+        logging.LogRecord(
+            name="bench",
+            level=levels[i % len(levels)],
+            pathname=__file__,
+            lineno=i,
+            msg="benchmark record %d",
+            args=(i,),
+            exc_info=None,
+        )
+        for i in range(n_records)
+    ]
+
+
+def records_per_second(
+    format_fn: Callable[[logging.LogRecord], str], records: List[logging.LogRecord]
+) -> float:
+    """Formats every record once and returns the achieved throughput.
+
+    Args:
+        format_fn (Callable[[logging.LogRecord], str]): formatter method under test
+        records (List[logging.LogRecord]): records to format
+
+    Returns:
+        float: records formatted per second
+    """
+    start: float = time.perf_counter()
+    for record in records:
+        format_fn(record)
+    return len(records) / (time.perf_counter() - start)
+
+
+def bench_color_formatter(n_records: int) -> None:
+    """Compares LogMessageColorFormatter throughput against the per-record Formatter reference."""
+    records: List[logging.LogRecord] = make_records(n_records)
+    results: List[Tuple[str, float]] = [
+        (
+            "per-record Formatter (before)",
+            records_per_second(_PerRecordColorFormatter().format, records),
+        ),
+        (
+            "precompiled per-level (after)",
+            records_per_second(LogMessageColorFormatter().format, records),
+        ),
+    ]
+    print(f"LogMessageColorFormatter throughput, {n_records} records:")
+    for name, rate in results:
+        print(f"    {name:<32s}: {rate:>12,.0f} records/s")
+    print(f"    {'speedup':<32s}: {results[1][1] / results[0][1]:>12.2f}x")
+
+
+class _DictJsonFormatter(logging.Formatter):
+    """Reference JSON formatter that formats the text fields, builds a dict and serializes it with json.dumps for every record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(
+            {
+                "asctime": self.formatTime(record, self.datefmt),
+                "levelname": record.levelname,
+                "filename": record.filename,
+                "method": record.funcName,
+                "lineno": record.lineno,
+                "class_name": None,
+                "message": record.getMessage(),
+            },
+            ensure_ascii=False,
+        )
+
+
+def bench_json_formatter(n_records: int) -> None:
+    """Compares JsonLinesFormatter throughput against the text formatter and a dict + json.dumps reference."""
+    records: List[logging.LogRecord] = make_records(n_records)
+    fmt: str = "[%(asctime)s] [%(levelname)-8s] - %(message)s"
+    datefmt: str = "%Y-%m-%d %H:%M:%S"
+    results: List[Tuple[str, float]] = [
+        (
+            "logging.Formatter (text)",
+            records_per_second(logging.Formatter(fmt, datefmt).format, records),
+        ),
+        (
+            "dict + json.dumps",
+            records_per_second(_DictJsonFormatter(fmt, datefmt).format, records),
+        ),
+        (
+            "JsonLinesFormatter",
+            records_per_second(JsonLinesFormatter(fmt, datefmt).format, records),
+        ),
+    ]
+    print(f"JSON-lines formatter throughput, {n_records} records:")
+    for name, rate in results:
+        print(f"    {name:<32s}: {rate:>12,.0f} records/s")
+    print(f"    {'vs dict + json.dumps':<32s}: {results[2][1] / results[1][1]:>12.2f}x")
+    print(f"    {'vs text':<32s}: {results[2][1] / results[0][1]:>12.2f}x")
+
+
+# endregion Formatter Throughput
+
+
+# region Call Overhead
+
+BENCH_DICT: Dict[str, Any] = {
+    "model": {"name": "bench", "layers": [64, 64, 10], "dropout": 0.1},
+    "optimizer": {"name": "adam", "lr": 1.0e-3, "betas": {"beta1": 0.9, "beta2": 0.999}},
+    "epochs": 10,
+}
+
+
+class BenchmarkCase(NamedTuple):
+
+    """Cost of one benchmarked call path."""
+
+    path: str
+    level: str
+    handler: str
+    depth: int
+    ns_per_call: float
+    peak_bytes_per_call: float
+
+
+class _ToolboxUser(UtilsClass):
+    def noop(self) -> None:
+        pass
+
+
+class _PlainUser:
+    def noop(self) -> None:
+        pass
+
+
+def _run_at_depth(depth: int, fn: Callable[[], Any], calls: int) -> int:
+    """Calls fn calls times from depth extra stack frames and returns the elapsed ns."""
+    if depth > 0:
+        return _run_at_depth(depth - 1, fn, calls)
+    start: int = time.perf_counter_ns()
+    for _ in range(calls):
+        fn()
+    return time.perf_counter_ns() - start
+
+
+def _peak_bytes_at_depth(depth: int, fn: Callable[[], Any], calls: int) -> float:
+    """Returns the largest traced memory above the starting level reached by a call of fn at depth. This is a memory high-water mark, not an allocation count."""
+    if depth > 0:
+        return _peak_bytes_at_depth(depth - 1, fn, calls)
+    fn()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline_bytes: int = tracemalloc.get_traced_memory()[0]
+        peak_bytes: int = 0
+        for _ in range(calls):
+            tracemalloc.reset_peak()
+            fn()
+            peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[1])
+        peak_per_call: float = max(0, peak_bytes - baseline_bytes)
+    finally:
+        tracemalloc.stop()
+    return peak_per_call
+
+
+def _make_handler(handler_name: str, tmp_dir: str) -> logging.Handler:
+    if handler_name == "null":
+        return logging.NullHandler()
+    if handler_name == "stream":
+        # StreamHandler.close leaves the stream open; bench_call_overhead closes it
+        return logging.StreamHandler(open(os.devnull, "w"))
+    return logging.FileHandler(os.path.join(tmp_dir, "bench.log"), mode="w")
+
+
+def bench_call_overhead(calls: int, depths: List[int]) -> List[BenchmarkCase]:
+    """Measures ns/call and peak traced bytes/call of the toolbox logging paths against plain logging, for enabled and disabled levels, several handlers and stack depths.
+
+    Args:
+        calls (int): calls per measurement
+        depths (List[int]): extra stack frames between the benchmark loop and its caller
+
+    Returns:
+        List[BenchmarkCase]: one entry per path, level, handler and depth
+    """
+    cases: List[BenchmarkCase] = []
+    toolbox_user: _ToolboxUser = _ToolboxUser()
+    memory_calls: int = max(1, min(calls, 1000))
+
+    def record(path: str, level: str, handler: str, depth: int, fn: Callable) -> None:
+        _run_at_depth(depth, fn, min(calls, 1000))  # warm caches
+        ns_per_call: float = _run_at_depth(depth, fn, calls) / calls
+        peak_bytes: float = _peak_bytes_at_depth(depth, fn, memory_calls)
+        cases.append(BenchmarkCase(path, level, handler, depth, ns_per_call, peak_bytes))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for handler_name in ("null", "stream", "file"):
+            logger: logging.Logger = logging.getLogger(f"toolbox_bench.{handler_name}")
+            logger.propagate = False
+            handler: logging.Handler = _make_handler(handler_name, tmp_dir)
+            logger.addHandler(handler)
+            toolbox_user.logger = logger
+            try:
+                for level_name, logger_level in (("enabled", DEBUG), ("disabled", INFO)):
+                    logger.setLevel(logger_level)
+                    paths: List[Tuple[str, Callable[[], Any]]] = [
+                        ("logging.Logger.log", lambda: logger.log(DEBUG, "bench %d", 1)),
+                        (
+                            "UtilsClass.log_message",
+                            lambda: UtilsClass.log_message("bench %d", DEBUG, 1, logger=logger),
+                        ),
+                        (
+                            "UtilsClass._print_status",
+                            lambda: toolbox_user._print_status("bench %d", DEBUG, 1),
+                        ),
+                        ("UtilsClass.iterdict", lambda: toolbox_user.iterdict(BENCH_DICT)),
+                    ]
+                    for depth in depths:
+                        for path, fn in paths:
+                            record(path, level_name, handler_name, depth, fn)
+            finally:
+                logger.removeHandler(handler)
+                handler.close()
+                if handler_name == "stream":
+                    handler.stream.close()
+
+    plain_user: _PlainUser = _PlainUser()
+    for depth in depths:
+        record("plain method", "-", "-", depth, plain_user.noop)
+        record("ExceptionLoggingMeta method", "-", "-", depth, toolbox_user.noop)
+    return cases
+
+
+def print_cases(cases: List[BenchmarkCase]) -> None:
+    print(
+        f"{'path':<28s} {'level':<9s} {'handler':<8s} {'depth':>5s} {'ns/call':>10s} {'peak B/call':>12s}"
+    )
+    for case in cases:
+        print(
+            f"{case.path:<28s} {case.level:<9s} {case.handler:<8s} {case.depth:>5d} {case.ns_per_call:>10.0f} {case.peak_bytes_per_call:>12.0f}"
+        )
+
+
+# endregion Call Overhead
+
+
+# region Import Time
+
+# Modules python_toolbox must not import as a side effect of being imported.
+LAZY_DEPENDENCIES: Tuple[str, ...] = ("numpy", "omegaconf", "PyQt5")
+
+_IMPORT_PROBE: str = f"""
+import sys
+import python_toolbox
+print(",".join(m for m in {LAZY_DEPENDENCIES!r} if m in sys.modules))
+"""
+
+
+def bench_import_time(budget_ms: float, repeats: int = 5) -> bool:
+    """Measures the cumulative import time of python_toolbox in fresh interpreters (python -X importtime) and checks it against a budget.
+
+    Args:
+        budget_ms (float): max allowed import time in milliseconds (best of repeats)
+        repeats (int, optional): number of interpreters to start. Defaults to 5.
+
+    Returns:
+        bool: True if the import stays within budget and loads none of LAZY_DEPENDENCIES
+    """
+    tools_dir: str = os.path.dirname(os.path.abspath(__file__))
+    import_times_ms: List[float] = []
+    loaded: str = ""
+    for _ in range(repeats):
+        probe: subprocess.CompletedProcess = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _IMPORT_PROBE],
+            capture_output=True,
+            text=True,
+            cwd=tools_dir,
+            check=True,
+        )
+        loaded = probe.stdout.strip()
+        for line in probe.stderr.splitlines():
+            fields: List[str] = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == "python_toolbox":
+                import_times_ms.append(int(fields[1]) / 1000)
+    best_ms: float = min(import_times_ms)
+    within_budget: bool = best_ms <= budget_ms and not loaded
+    print(f"python_toolbox import time, best of {repeats}:")
+    print(f"    {'cumulative':<32s}: {best_ms:>12.1f} ms (budget {budget_ms:.1f} ms)")
+    print(f"    {'heavy dependencies loaded':<32s}: {loaded or 'none':>12s}")
+    print(f"    {'result':<32s}: {'PASS' if within_budget else 'FAIL':>12s}")
+    return within_budget
+
+
+# endregion Import Time
+
+
+def main(
+    n_records: int,
+    calls: int,
+    depths: List[int],
+    as_json: bool,
+    import_only: bool,
+    import_budget_ms: float,
+) -> int:
+    if import_only:
+        return 0 if bench_import_time(import_budget_ms) else 1
+    cases: List[BenchmarkCase] = bench_call_overhead(calls, depths)
+    if as_json:
+        print(json.dumps([case._asdict() for case in cases], indent=2))
+        return 0
+    within_budget: bool = bench_import_time(import_budget_ms)
+    print()
+    bench_color_formatter(n_records)
+    print()
+    bench_json_formatter(n_records)
+    print()
+    print_cases(cases)
+    return 0 if within_budget else 1
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        prog=os.path.basename(__file__),
+        usage="%(prog)s [options]",
+        description="Measure the time and peak memory overhead of python_toolbox logging utilities.",
+        prefix_chars="-",
+        add_help=True,
+    )
+    parser.add_argument(
+        "-n",
+        "--records",
+        type=int,
+        default=200000,
+        help="Number of log records for the formatter throughput benchmark. Defaults to 200000.",
+        metavar="N",
+        dest="records",
+    )
+    parser.add_argument(
+        "-c",
+        "--calls",
+        type=int,
+        default=20000,
+        help="Calls per ns/call measurement; peak bytes/call uses at most 1000. Defaults to 20000.",
+        metavar="N",
+        dest="calls",
+    )
+    parser.add_argument(
+        "-d",
+        "--depths",
+        default="0,16,64",
+        help="Comma-separated stack depths to call from. Defaults to 0,16,64.",
+        metavar="DEPTHS",
+        dest="depths",
+    )
+    parser.add_argument(
+        "-j",
+        "--json",
+        help="Output the call-overhead cases as JSON instead of tables. Defaults to False.",
+        dest="as_json",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-i",
+        "--import-only",
+        help="Only run the import-time benchmark. Exits non-zero if it is over budget. Defaults to False.",
+        dest="import_only",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-b",
+        "--import-budget-ms",
+        type=float,
+        default=100.0,
+        help="Import-time budget for python_toolbox in milliseconds. Defaults to 100.",
+        metavar="MS",
+        dest="import_budget_ms",
+    )
+    args = parser.parse_args(sys.argv[1:])
+    sys.exit(
+        main(
+            args.records,
+            args.calls,
+            [int(depth) for depth in args.depths.split(",")],
+            args.as_json,
+            args.import_only,
+            args.import_budget_ms,
+        )
+    )